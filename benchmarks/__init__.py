@@ -0,0 +1,6 @@
+"""Offline benchmarks for feature extraction, index search and the HTTP API.
+
+Everything runs without network or GPU: images are synthetic, models use
+randomly initialised weights written to a scratch directory, and the API is
+driven in-process. Run ``python -m benchmarks --help`` for the suites.
+"""
@@ -0,0 +1,170 @@
+import argparse
+import shutil
+import sys
+import tempfile
+from typing import List
+
+
+def _ints(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def _strs(value: str) -> List[str]:
+    return [v for v in value.split(",") if v]
+
+
+def _add_extract_args(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--backends", type=_strs, default=["eager"], help="Inference backends."
+    )
+    parser.add_argument(
+        "--batch_sizes", type=_ints, default=[1, 8, 32], help="Extraction batch sizes."
+    )
+    parser.add_argument(
+        "--num_images", type=int, default=64, help="Images per measurement."
+    )
+
+
+def _add_index_args(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--sizes",
+        type=_ints,
+        default=[10_000, 100_000, 1_000_000],
+        help="Database sizes in vectors.",
+    )
+    parser.add_argument(
+        "--index_types",
+        type=_strs,
+        default=["flat", "ivf", "hnsw"],
+        help="Index types.",
+    )
+    parser.add_argument(
+        "--encodings",
+        type=_strs,
+        default=["flat", "sq8", "fp16", "pq"],
+        help="Index encodings, each built with every index type.",
+    )
+    parser.add_argument(
+        "--rerank_factors",
+        type=_ints,
+        default=[0, 4],
+        help="Re-rank factors for the compressed encodings (0: no re-ranking).",
+    )
+    parser.add_argument("--dim", type=int, default=512, help="Vector dimension.")
+    parser.add_argument(
+        "--num_queries",
+        type=int,
+        default=1000,
+        help="Queries for recall and throughput.",
+    )
+    parser.add_argument("--k", type=int, default=5, help="Neighbours per query.")
+
+
+def _add_api_args(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--images_per_class", type=int, default=20, help="Images per class on disk."
+    )
+    parser.add_argument(
+        "--requests", type=int, default=200, help="Requests per scenario."
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="Requests in flight at once."
+    )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Offline benchmarks for the Test-Time Compute Classifier.",
+    )
+    suites = parser.add_subparsers(dest="suite", required=True)
+    extract = suites.add_parser("extract", help="Feature extraction throughput.")
+    index = suites.add_parser("index", help="Index build, search and recall.")
+    api = suites.add_parser("api", help="In-process load test of the HTTP API.")
+    everything = suites.add_parser("all", help="Run every suite.")
+    for suite in (extract, index, api, everything):
+        suite.add_argument("--output", type=str, help="Write the JSON results here.")
+        suite.add_argument(
+            "--workdir",
+            type=str,
+            help="Scratch directory for data, weights and indexes (default: temporary).",
+        )
+        suite.add_argument("--seed", type=int, default=0, help="Random seed.")
+        suite.add_argument(
+            "--model", type=str, default="ResNetExtractor", help="Feature extractor."
+        )
+        suite.add_argument(
+            "--num_classes", type=int, default=10, help="Synthetic classes."
+        )
+    for suite in (extract, everything):
+        _add_extract_args(suite)
+    for suite in (index, everything):
+        _add_index_args(suite)
+    for suite in (api, everything):
+        _add_api_args(suite)
+
+    compare = suites.add_parser("compare", help="Compare two result files.")
+    compare.add_argument("baseline", type=str)
+    compare.add_argument("candidate", type=str)
+    compare.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Relative change that counts as a regression.",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.suite == "compare":
+        from benchmarks.compare import compare
+
+        sys.exit(1 if compare(args.baseline, args.candidate, args.threshold) else 0)
+
+    from benchmarks.common import configure_environment, metadata, write_results
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="ttc-benchmark-")
+    configure_environment(workdir, FEATURE_MODEL=args.model)
+    # src modules read Settings at import, so they are imported only from here on
+    results = {}
+    try:
+        if args.suite in ("extract", "all"):
+            from benchmarks import extraction
+
+            results["extract"] = extraction.run(
+                args.model, args.backends, args.batch_sizes, args.num_images, args.seed
+            )
+        if args.suite in ("index", "all"):
+            from benchmarks import index
+
+            results["index"] = index.run(
+                args.sizes,
+                args.index_types,
+                args.encodings,
+                args.rerank_factors,
+                args.dim,
+                args.num_classes,
+                args.num_queries,
+                args.k,
+                seed=args.seed,
+            )
+        if args.suite in ("api", "all"):
+            from benchmarks import api
+
+            results["api"] = api.run(
+                args.num_classes,
+                args.images_per_class,
+                args.requests,
+                args.concurrency,
+                args.seed,
+            )
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    results["meta"] = metadata(vars(args))
+    write_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict
+import httpx
+import numpy as np
+from benchmarks.common import StageTimer, summarize
+from benchmarks.synthetic import (
+    encode_jpeg,
+    synthetic_image,
+    write_dataset,
+    write_random_weights,
+)
+from src.config.settings import Settings
+
+Send = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+def run(
+    num_classes: int,
+    images_per_class: int,
+    requests: int,
+    concurrency: int,
+    seed: int = 0,
+) -> dict:
+    """Drive the app in-process and report latency, throughput and stage timings.
+
+    The app is started through its lifespan against a synthetic data
+    directory and called over an ASGI transport, so no socket or server
+    process is involved. Stage timings wrap the default model's inference
+    executor: ``io`` is decoding and file work, ``extract`` is one
+    (micro-batched) forward pass and ``index`` is a FAISS call.
+    """
+    write_random_weights(Settings.WEIGHTS_PATH, Settings.FEATURE_MODEL)
+    write_dataset(Settings.DATA_PATH, num_classes, images_per_class, seed)
+    rng = np.random.default_rng(seed + 1)
+    payloads = [encode_jpeg(synthetic_image(rng, i % num_classes)) for i in range(64)]
+    return asyncio.run(_run(payloads, requests, concurrency))
+
+
+async def _run(payloads, requests: int, concurrency: int) -> dict:
+    from src.app import app
+    from src.api import routes
+
+    stages: Dict[str, StageTimer] = {"current": StageTimer()}
+    start = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        startup_s = time.perf_counter() - start
+        default = routes.registry.get(routes.registry.default)
+        _instrument(routes.TestTimeRouter, default.inference_executor, stages)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://benchmark", timeout=None
+        ) as client:
+            response = await client.post(
+                "/embed", files={"files": ("query.jpg", payloads[0], "image/jpeg")}
+            )
+            response.raise_for_status()
+            vector = response.json()["embeddings"][0]
+
+            def classify(client, i):
+                payload = payloads[i % len(payloads)]
+                return client.post(
+                    "/classify", files={"file": ("query.jpg", payload, "image/jpeg")}
+                )
+
+            def embed(client, i):
+                payload = payloads[i % len(payloads)]
+                return client.post(
+                    "/embed", files={"files": ("query.jpg", payload, "image/jpeg")}
+                )
+
+            def search(client, i):
+                return client.post("/search", json={"vector": vector})
+
+            scenarios = {}
+            for name, send in (
+                ("classify", classify),
+                ("embed", embed),
+                ("search", search),
+            ):
+                # Warm up outside the measurement
+                await _load(client, send, concurrency, concurrency)
+                stages["current"] = StageTimer()
+                scenarios[name] = await _load(client, send, requests, concurrency)
+                scenarios[name]["stages"] = stages["current"].summary()
+    return {
+        "startup_s": startup_s,
+        "vectors": default.feature_db.snapshot.ntotal,
+        "scenarios": scenarios,
+    }
+
+
+async def _load(
+    client: httpx.AsyncClient, send: Send, requests: int, concurrency: int
+) -> dict:
+    latencies = []
+    errors = 0
+    pending = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in pending:
+            start = time.perf_counter()
+            response = await send(client, i)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall_s = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": requests / wall_s,
+        "latency": summarize(latencies),
+    }
+
+
+def _instrument(router_cls, executor, stages: Dict[str, StageTimer]):
+    # Shadow the coroutine methods with timed ones: the executor's on the
+    # instance, the router's shared I/O helper on the class
+    for owner, method, stage in (
+        (router_cls, "_run_io", "io"),
+        (executor, "extract", "extract"),
+        (executor, "run_index", "index"),
+        (executor, "run_search", "index"),
+    ):
+        original = getattr(owner, method)
+
+        async def timed(*args, _original=original, _stage=stage, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await _original(*args, **kwargs)
+            finally:
+                stages["current"].record(_stage, time.perf_counter() - start)
+
+        setattr(owner, method, staticmethod(timed) if owner is router_cls else timed)
@@ -0,0 +1,100 @@
+import json
+import os
+import platform
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence
+import numpy as np
+
+
+def configure_environment(workdir: str, **overrides: str):
+    """Point ``Settings`` at ``workdir``; must run before ``src`` is imported.
+
+    Settings are read from the environment once, at import, so this fails if
+    ``src.config.settings`` has already been loaded.
+    """
+    if "src.config.settings" in sys.modules:
+        raise RuntimeError("Configure the environment before importing src.")
+    env = {
+        "DATA_PATH": os.path.join(workdir, "data"),
+        "DATABASE_PATH": os.path.join(workdir, "database", "features.faiss"),
+        "SHARD_PATH": os.path.join(workdir, "database", "shards"),
+        "WEIGHTS_PATH": os.path.join(workdir, "weights"),
+        "ALLOW_WEIGHTS_DOWNLOAD": "0",
+        "BACKGROUND_STARTUP": "0",
+        # Cache hits would measure the cache rather than the model
+        "FEATURE_CACHE_SIZE": "0",
+        "LOGGING_LEVEL": "WARNING",
+    }
+    env.update(overrides)
+    os.environ.update(env)
+    for key in ("DATA_PATH", "WEIGHTS_PATH"):
+        os.makedirs(env[key], exist_ok=True)
+    os.makedirs(os.path.dirname(env["DATABASE_PATH"]), exist_ok=True)
+
+
+def summarize(samples: Sequence[float]) -> Dict[str, float]:
+    """Count and millisecond mean/p50/p95/p99/max of durations in seconds."""
+    if not len(samples):
+        return {"count": 0}
+    ms = np.asarray(samples, dtype=np.float64) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "count": len(ms),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "max_ms": float(ms.max()),
+    }
+
+
+class StageTimer:
+    """Collect durations per named stage."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def record(self, stage: str, seconds: float):
+        self.samples.setdefault(stage, []).append(seconds)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {stage: summarize(s) for stage, s in self.samples.items()}
+
+
+def metadata(args: Optional[dict] = None) -> dict:
+    """Versions and hardware, so results from different runs can be compared."""
+    info = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+    }
+    for module in ("torch", "torchvision", "faiss"):
+        try:
+            info[module] = __import__(module).__version__
+        except ImportError:
+            info[module] = None
+    if "torch" in sys.modules:
+        info["torch_threads"] = sys.modules["torch"].get_num_threads()
+    if args is not None:
+        info["args"] = args
+    return info
+
+
+def write_results(results: dict, path: Optional[str]):
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if path:
+        with open(path, "w") as f:
+            f.write(text + "\n")
+    print(text)
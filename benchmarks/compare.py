@@ -0,0 +1,72 @@
+import json
+from typing import Dict
+
+# Fields that identify a result row rather than measure it
+IDENTITY = (
+    "model",
+    "backend",
+    "batch_size",
+    "vectors",
+    "index_type",
+    "encoding",
+    "rerank_factor",
+)
+LOWER_IS_BETTER = ("_ms", "_s")
+HIGHER_IS_BETTER = ("_per_s", "_qps", "_rps", "recall")
+
+
+def flatten(value, prefix: str = "") -> Dict[str, float]:
+    """Numeric leaves keyed by path; list rows are keyed by their identity fields."""
+    flat = {}
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key == "meta" or key in IDENTITY:
+                continue
+            flat.update(flatten(item, f"{prefix}{key}."))
+    elif isinstance(value, list):
+        for i, item in enumerate(value):
+            name = ",".join(
+                f"{key}={item[key]}"
+                for key in IDENTITY
+                if isinstance(item, dict) and key in item
+            )
+            flat.update(flatten(item, f"{prefix}[{name or i}]."))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        flat[prefix.rstrip(".")] = float(value)
+    return flat
+
+
+def direction(metric: str) -> int:
+    """1 if a larger value is better, -1 if smaller is better, 0 if neutral."""
+    if metric.endswith(HIGHER_IS_BETTER):
+        return 1
+    if metric.endswith(LOWER_IS_BETTER):
+        return -1
+    return 0
+
+
+def compare(baseline_path: str, candidate_path: str, threshold: float = 0.1) -> int:
+    """Print relative changes between two result files; return the regression count.
+
+    A regression is a metric that moved in its worse direction by more than
+    ``threshold`` (a fraction).
+    """
+    with open(baseline_path) as f:
+        baseline = flatten(json.load(f))
+    with open(candidate_path) as f:
+        candidate = flatten(json.load(f))
+    regressions = 0
+    for metric in sorted(baseline.keys() & candidate.keys()):
+        before, after = baseline[metric], candidate[metric]
+        sign = direction(metric)
+        if not sign or before == 0:
+            continue
+        change = (after - before) / abs(before)
+        regressed = sign * change < -threshold
+        regressions += regressed
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{metric}: {before:.4g} -> {after:.4g} ({change:+.1%}){flag}")
+    for metric in sorted(baseline.keys() ^ candidate.keys()):
+        print(f"{metric}: only in {'baseline' if metric in baseline else 'candidate'}")
+    print(f"{regressions} regressions beyond {threshold:.0%}.")
+    return regressions
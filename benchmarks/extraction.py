@@ -0,0 +1,58 @@
+import io
+import time
+from typing import List, Sequence
+import numpy as np
+import torch
+from benchmarks.common import StageTimer
+from benchmarks.synthetic import encode_jpeg, synthetic_image, write_random_weights
+from src.config.settings import Settings
+from src.utils.helpers import dynamic_import, load_image
+
+
+def run(
+    model: str,
+    backends: Sequence[str],
+    batch_sizes: Sequence[int],
+    num_images: int,
+    seed: int = 0,
+) -> List[dict]:
+    """Throughput and per-batch decode/preprocess/forward latency per backend."""
+    write_random_weights(Settings.WEIGHTS_PATH, model)
+    rng = np.random.default_rng(seed)
+    payloads = [encode_jpeg(synthetic_image(rng, i % 10)) for i in range(num_images)]
+    results = []
+    for backend in backends:
+        start = time.perf_counter()
+        extractor = dynamic_import("src.features", model)(backend=backend)
+        load_s = time.perf_counter() - start
+        for batch_size in batch_sizes:
+            # One untimed batch so lazy initialisation does not skew the first sample
+            _extract(extractor, payloads[:batch_size], StageTimer())
+            timer = StageTimer()
+            start = time.perf_counter()
+            for i in range(0, num_images, batch_size):
+                _extract(extractor, payloads[i : i + batch_size], timer)
+            wall_s = time.perf_counter() - start
+            results.append(
+                {
+                    "model": model,
+                    "backend": backend,
+                    # Differs from backend if it failed its tolerance check
+                    "effective_backend": extractor.backend,
+                    "batch_size": batch_size,
+                    "images": num_images,
+                    "load_s": load_s,
+                    "images_per_s": num_images / wall_s,
+                    "per_batch": timer.summary(),
+                }
+            )
+    return results
+
+
+def _extract(extractor, payloads: List[bytes], timer: StageTimer):
+    with timer.time("decode"):
+        images = [load_image(io.BytesIO(payload)) for payload in payloads]
+    with timer.time("preprocess"):
+        batch = torch.stack([extractor.preprocess(image) for image in images])
+    with timer.time("forward"):
+        extractor.forward(batch)
@@ -0,0 +1,145 @@
+import os
+import time
+from typing import List, Sequence
+import faiss
+import numpy as np
+from benchmarks.common import summarize
+from benchmarks.synthetic import feature_matrix
+from src.classifier.classifier import Classifier
+from src.config.settings import Settings
+from src.database.feature_database import FeatureDatabase
+from src.search.similarity_search import SimilaritySearch
+
+
+def run(
+    sizes: Sequence[int],
+    index_types: Sequence[str],
+    encodings: Sequence[str],
+    rerank_factors: Sequence[int],
+    dim: int,
+    num_classes: int,
+    num_queries: int,
+    k: int,
+    single_queries: int = 200,
+    seed: int = 0,
+) -> List[dict]:
+    """Build time, search latency, recall@k and predict latency per index.
+
+    Every index type is built with every encoding, and compressed encodings
+    once per re-rank factor, so the rows show what each encoding trades in
+    recall for memory and latency. Recall is measured against exact L2
+    search over the same vectors. Single queries time one-vector searches
+    (the /classify path), batched throughput times all ``num_queries`` in
+    one call.
+    """
+    results = []
+    for n in sizes:
+        features, classes = feature_matrix(n + num_queries, dim, num_classes, seed)
+        base, queries = features[:n], features[n:]
+        labels = [f"class_{c:03d}" for c in classes[:n]]
+
+        exact = faiss.IndexFlatL2(dim)
+        exact.add(base)
+        start = time.perf_counter()
+        _, truth = exact.search(queries, k)
+        exact_s = time.perf_counter() - start
+        del exact
+
+        for index_type in index_types:
+            for encoding in encodings:
+                # Re-ranking exact vectors with exact distances changes nothing
+                factors = [0] if encoding == "flat" else rerank_factors
+                for rerank_factor in factors:
+                    results.append(
+                        _run_one(
+                            base,
+                            labels,
+                            queries,
+                            truth,
+                            index_type,
+                            encoding,
+                            rerank_factor,
+                            k,
+                            single_queries,
+                        )
+                    )
+                    results[-1]["exact_search_qps"] = num_queries / exact_s
+        del features, base, queries
+    return results
+
+
+def _run_one(
+    base: np.ndarray,
+    labels: List[str],
+    queries: np.ndarray,
+    truth: np.ndarray,
+    index_type: str,
+    encoding: str,
+    rerank_factor: int,
+    k: int,
+    single_queries: int,
+) -> dict:
+    n, dim = base.shape
+    path = os.path.join(
+        os.path.dirname(Settings.DATABASE_PATH),
+        f"bench-{n}-{index_type}-{encoding}-{rerank_factor}.faiss",
+    )
+    db = FeatureDatabase(
+        dim,
+        database_path=path,
+        index_type=index_type,
+        index_encoding=encoding,
+        rerank_factor=rerank_factor,
+    )
+
+    start = time.perf_counter()
+    # Chunked like a sync, which publishes a single generation at the end
+    with db.write_batch():
+        for i in range(0, n, Settings.INDEX_CHUNK_SIZE):
+            end = i + Settings.INDEX_CHUNK_SIZE
+            db.add_features(base[i:end], labels[i:end])
+    build_s = time.perf_counter() - start
+
+    single = []
+    for query in queries[:single_queries]:
+        start = time.perf_counter()
+        db.search(query[None], k)
+        single.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    _, ids = db.search(queries, k)
+    batch_s = time.perf_counter() - start
+    recall = np.mean(
+        [
+            len(np.intersect1d(found, expected)) / k
+            for found, expected in zip(ids, truth)
+        ]
+    )
+
+    classifier = Classifier(SimilaritySearch(db))
+    predict = []
+    for query in queries[:single_queries]:
+        start = time.perf_counter()
+        classifier.predict(query[None], k)
+        predict.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    classifier.predict_detailed(queries, k)
+    predict_batch_s = time.perf_counter() - start
+
+    return {
+        "vectors": n,
+        "dim": dim,
+        "index_type": index_type,
+        "encoding": encoding,
+        "rerank_factor": rerank_factor,
+        "index": f"{db.kind} {db.encoding}",
+        "memory_bytes": db.memory_bytes(),
+        "k": k,
+        "build_s": build_s,
+        "vectors_per_s": n / build_s,
+        "search_single": summarize(single),
+        "search_batch_qps": len(queries) / batch_s,
+        "recall": float(recall),
+        "predict_single": summarize(predict),
+        "predict_batch_qps": len(queries) / predict_batch_s,
+    }
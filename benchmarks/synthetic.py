@@ -0,0 +1,76 @@
+import io
+import os
+from typing import List, Tuple
+import numpy as np
+from PIL import Image
+
+# Torchvision architecture behind each extractor, for writing random weights
+MODEL_ARCHS = {"ResNetExtractor": "resnet50", "DenseNetExtractor": "densenet121"}
+
+
+def synthetic_image(
+    rng: np.random.Generator, label: int = 0, size: Tuple[int, int] = (320, 240)
+) -> Image.Image:
+    """A noisy RGB image whose base colour depends on ``label``."""
+    base = np.array(
+        [(label * 67) % 256, (label * 131 + 80) % 256, (label * 29 + 160) % 256]
+    )
+    noise = rng.integers(-40, 41, (size[1], size[0], 3))
+    return Image.fromarray(np.clip(base + noise, 0, 255).astype(np.uint8))
+
+
+def encode_jpeg(image: Image.Image, quality: int = 90) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def write_dataset(
+    data_path: str, num_classes: int, images_per_class: int, seed: int = 0
+) -> List[str]:
+    """Write ``class_XXX/NNNN.jpg`` files under ``data_path`` and return the classes."""
+    rng = np.random.default_rng(seed)
+    classes = [f"class_{i:03d}" for i in range(num_classes)]
+    for label, name in enumerate(classes):
+        class_dir = os.path.join(data_path, name)
+        os.makedirs(class_dir, exist_ok=True)
+        for i in range(images_per_class):
+            with open(os.path.join(class_dir, f"{i:04d}.jpg"), "wb") as f:
+                f.write(encode_jpeg(synthetic_image(rng, label)))
+    return classes
+
+
+def write_random_weights(weights_path: str, model: str) -> str:
+    """Save randomly initialised weights where ``_pretrained`` looks for them."""
+    import torch
+    from torchvision import models
+    from src.features.feature_extractor import weights_file
+
+    if model not in MODEL_ARCHS:
+        raise ValueError(f"No architecture known for {model}; add it to MODEL_ARCHS.")
+    arch = MODEL_ARCHS[model]
+    path = weights_file(arch, weights_path)
+    if not os.path.exists(path):
+        torch.manual_seed(0)
+        torch.save(models.get_model(arch, weights=None).state_dict(), path)
+    return path
+
+
+def feature_matrix(
+    n: int, dim: int, num_classes: int, seed: int = 0, spread: float = 0.5
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Clustered float32 vectors and their integer classes.
+
+    Vectors are drawn around one random centre per class, so nearest
+    neighbours and recall behave more like real embeddings than uniform noise.
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((num_classes, dim), dtype=np.float32)
+    classes = rng.integers(0, num_classes, n)
+    features = np.empty((n, dim), dtype=np.float32)
+    # Fill in blocks to bound the temporary noise array at large n
+    for start in range(0, n, 65536):
+        block = classes[start : start + 65536]
+        noise = rng.standard_normal((len(block), dim), dtype=np.float32)
+        features[start : start + len(block)] = centres[block] + spread * noise
+    return features, classes
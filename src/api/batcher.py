@@ -0,0 +1,96 @@
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+from src.utils.logger import logger
+from src.config.settings import Settings
+
+
+class MicroBatcher:
+    """Coalesce concurrent requests into batched calls of ``process_batch``.
+
+    Requests are collected until ``max_batch_size`` items are waiting or
+    ``max_wait_ms`` has passed since the first one arrived. ``process_batch``
+    is awaited with the batch and must return one result per item; a result
+    that is an exception is raised to that item's caller only. ``stop``
+    fails every request that has not been answered yet.
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch_size: int = Settings.MAX_BATCH_SIZE,
+        max_wait_ms: float = Settings.BATCH_WINDOW_MS,
+    ):
+        if max_batch_size <= 0:
+            raise ValueError(
+                f"Max batch size must be greater than 0, got {max_batch_size}"
+            )
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # Requests taken off the queue but not answered yet
+        self._in_flight: List[Tuple[Any, asyncio.Future]] = []
+
+    async def submit(self, item: Any) -> Any:
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def stop(self):
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        pending = self._in_flight
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for _, future in pending:
+            if not future.done():
+                future.set_exception(RuntimeError("Batcher stopped."))
+        self._in_flight = []
+        self._worker = None
+        self._queue = None
+
+    async def _collect(self) -> List[Tuple[Any, asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = self._in_flight = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = await self.process_batch(items)
+                if len(results) != len(items):
+                    raise RuntimeError(
+                        f"Expected {len(items)} results from batch, got {len(results)}"
+                    )
+            except Exception as e:
+                logger.error(f"Batch of {len(items)} requests failed: {e}")
+                results = [e] * len(items)
+            logger.debug("Processed batch of {} requests.", len(items))
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+            self._in_flight = []
@@ -0,0 +1,108 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, List, Optional, Sequence
+import numpy as np
+from PIL import Image
+from src.utils.helpers import dynamic_import
+from src.utils.logger import logger
+from src.config.settings import Settings
+
+_worker_extractor = None
+
+
+def _init_worker(module_name: str, class_name: str):
+    global _worker_extractor
+    _worker_extractor = dynamic_import(module_name, class_name)()
+
+
+def _extract_in_worker(
+    images: List[Image.Image], digests: Optional[Sequence[str]]
+) -> np.ndarray:
+    return _worker_extractor.extract_batch(images, digests=digests)
+
+
+class InferenceExecutor:
+    """Run blocking work off the asyncio event loop.
+
+    Feature extraction goes to a thread or process pool depending on
+    ``executor_type``; process workers build their own extractor once at
+    start-up. File I/O runs on a separate thread pool. Index writes run on a
+    single thread so they stay ordered, while searches, which only read the
+    database's published snapshot, run on their own pool alongside them.
+    Executors for several models can share one ``io_pool``; it is left
+    running on shutdown.
+    """
+
+    def __init__(
+        self,
+        feature_extractor,
+        executor_type: str = Settings.EXECUTOR_TYPE,
+        max_workers: int = Settings.EXECUTOR_WORKERS,
+        io_pool: Optional[Executor] = None,
+    ):
+        if executor_type not in ("thread", "process"):
+            raise ValueError(
+                f"Executor type must be 'thread' or 'process', got {executor_type}"
+            )
+        self.feature_extractor = feature_extractor
+        self.executor_type = executor_type
+        if executor_type == "process":
+            extractor_cls = type(feature_extractor)
+            self._extract_pool: Executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(extractor_cls.__module__, extractor_cls.__name__),
+            )
+        else:
+            self._extract_pool = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="extract"
+            )
+        self._owns_io_pool = io_pool is None
+        self._io_pool = io_pool or ThreadPoolExecutor(
+            max_workers=Settings.NUM_WORKERS, thread_name_prefix="io"
+        )
+        self._index_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="index")
+        self._search_pool = ThreadPoolExecutor(
+            max_workers=Settings.SEARCH_WORKERS, thread_name_prefix="search"
+        )
+        logger.info(
+            f"Inference executor started with {max_workers} {executor_type} workers."
+        )
+
+    async def extract(
+        self,
+        images: List[Image.Image],
+        digests: Optional[Sequence[str]] = None,
+    ) -> np.ndarray:
+        if self.executor_type == "process":
+            fn = partial(_extract_in_worker, images, digests)
+        else:
+            fn = partial(self.feature_extractor.extract_batch, images, digests=digests)
+        return await self._submit(self._extract_pool, fn)
+
+    async def run(self, fn: Callable, *args: Any, **kwargs: Any) -> Any:
+        """Run blocking I/O such as file reads, writes and copies."""
+        return await self._submit(self._io_pool, partial(fn, *args, **kwargs))
+
+    async def run_index(self, fn: Callable, *args: Any, **kwargs: Any) -> Any:
+        """Run an index mutation or save, one at a time."""
+        return await self._submit(self._index_pool, partial(fn, *args, **kwargs))
+
+    async def run_search(self, fn: Callable, *args: Any, **kwargs: Any) -> Any:
+        """Run a read-only index search, concurrently with writes and other searches."""
+        return await self._submit(self._search_pool, partial(fn, *args, **kwargs))
+
+    def shutdown(self, wait: bool = True):
+        pools = [self._extract_pool, self._index_pool, self._search_pool]
+        if self._owns_io_pool:
+            pools.append(self._io_pool)
+        for pool in pools:
+            pool.shutdown(wait=wait)
+        logger.info("Inference executor shut down.")
+
+    @staticmethod
+    async def _submit(pool: Executor, fn: Callable) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(pool, fn)
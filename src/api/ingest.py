@@ -0,0 +1,143 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from src.utils.logger import logger
+from src.config.settings import Settings
+
+
+@dataclass
+class IngestJob:
+    class_name: str
+    # Saved files, relative to the data directory, and their content hashes
+    paths: List[str]
+    digests: List[str]
+    duplicates: int = 0
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "queued"
+    added: int = 0
+    # Saved files that failed to decode; they are deleted again
+    invalid: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "class_name": self.class_name,
+            "status": self.status,
+            "queued": len(self.paths),
+            "added": self.added,
+            "invalid": self.invalid,
+            "duplicates": self.duplicates,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class IngestionQueue:
+    """Index uploaded images on a background task, many jobs at a time.
+
+    Jobs that arrive within ``max_wait_ms`` of the first queued one are
+    handed to ``process_jobs`` together, up to ``max_images`` files, so a
+    burst of small uploads costs one extraction pass, one index add and one
+    persist. ``process_jobs`` fills in each job's ``added`` and ``invalid``;
+    if it raises, every job in the batch fails. Finished jobs are kept for
+    status queries, the oldest dropped beyond ``history``.
+    """
+
+    def __init__(
+        self,
+        process_jobs: Callable[[List[IngestJob]], Awaitable[None]],
+        max_images: int = Settings.INGEST_BATCH_IMAGES,
+        max_wait_ms: float = Settings.INGEST_WINDOW_MS,
+        history: int = Settings.INGEST_JOB_HISTORY,
+    ):
+        if max_images <= 0:
+            raise ValueError(f"Max images must be greater than 0, got {max_images}")
+        self.process_jobs = process_jobs
+        self.max_images = max_images
+        self.max_wait_ms = max_wait_ms
+        self.history = history
+        self._jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._pending_digests: Set[str] = set()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def submit(self, job: IngestJob) -> IngestJob:
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        self._jobs[job.id] = job
+        self._pending_digests.update(job.digests)
+        self._queue.put_nowait(job)
+        self._trim()
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        return self._jobs.get(job_id)
+
+    def is_pending(self, digest: str) -> bool:
+        """Whether a queued or running job is already indexing these bytes."""
+        return digest in self._pending_digests
+
+    async def stop(self):
+        """Stop the worker; queued files are on disk, so the next sync indexes them."""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        self._queue = None
+
+    async def _collect(self) -> List[IngestJob]:
+        loop = asyncio.get_running_loop()
+        jobs = [await self._queue.get()]
+        images = len(jobs[0].paths)
+        deadline = loop.time() + self.max_wait_ms / 1000
+        while images < self.max_images:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                job = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            jobs.append(job)
+            images += len(job.paths)
+        return jobs
+
+    async def _run(self):
+        while True:
+            jobs = await self._collect()
+            for job in jobs:
+                job.status = "running"
+            try:
+                await self.process_jobs(jobs)
+                status, error = "done", None
+            except Exception as e:
+                logger.error(f"Ingestion of {len(jobs)} jobs failed: {e}")
+                status, error = "failed", str(e)
+            finished = time.time()
+            for job in jobs:
+                job.status, job.error, job.finished_at = status, error, finished
+                self._pending_digests.difference_update(job.digests)
+                job.done.set()
+            logger.debug("Ingested {} jobs.", len(jobs))
+
+    def _trim(self):
+        finished = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.status in ("done", "failed")
+        ]
+        for job_id in finished[: max(len(self._jobs) - self.history, 0)]:
+            del self._jobs[job_id]
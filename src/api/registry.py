@@ -0,0 +1,195 @@
+import asyncio
+import gc
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from src.api.batcher import MicroBatcher
+from src.api.executor import InferenceExecutor
+from src.classifier.classifier import Classifier
+from src.data.data_loader import DataLoader
+from src.data.manifest import Manifest
+from src.database.feature_database import FeatureDatabase
+from src.database.sync import sync_database
+from src.search.similarity_search import SimilaritySearch
+from src.utils.helpers import dynamic_import, model_path
+from src.utils.logger import logger
+from src.config.settings import Settings
+
+
+@dataclass
+class LoadedModel:
+    """A feature extractor with its own database, manifest and executors."""
+
+    name: str
+    feature_extractor: Any
+    feature_db: FeatureDatabase
+    manifest: Manifest
+    similarity_search: SimilaritySearch
+    classifier: Classifier
+    inference_executor: InferenceExecutor
+    classify_batcher: Optional[MicroBatcher] = None
+    # Parameters and buffers, once per process holding a copy of the model
+    model_bytes: int = 0
+    # Requests currently holding the model; it is not unloaded while > 0
+    users: int = 0
+
+    def memory_bytes(self) -> int:
+        return self.model_bytes + self.feature_db.memory_bytes()
+
+
+class ModelRegistry:
+    """The models the API serves, loaded on first use and evicted when idle.
+
+    Every model keeps its index and manifest under ``model_path``, so
+    vectors from different backbones never share an index, and is synced
+    with the data directory when it loads. Loaded models are kept in
+    least-recently-used order; when their estimated footprint exceeds
+    ``memory_budget_mb``, idle ones are unloaded, oldest first, until it
+    fits. The default model is never unloaded.
+    """
+
+    def __init__(
+        self,
+        data_loader: DataLoader,
+        classify_batch: Callable[[LoadedModel, List[Any]], Awaitable[List[Any]]],
+        default: str = Settings.FEATURE_MODEL,
+        models: List[str] = Settings.MODELS,
+        memory_budget_mb: float = Settings.MODEL_MEMORY_MB,
+    ):
+        self.data_loader = data_loader
+        self.default = default
+        self.names = list(dict.fromkeys([default, *models]))
+        self.memory_budget = int(memory_budget_mb * 2**20)
+        self._classify_batch = classify_batch
+        self._models: "OrderedDict[str, LoadedModel]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # File work is not tied to a model, so all models share one pool
+        self.io_pool = ThreadPoolExecutor(
+            max_workers=Settings.NUM_WORKERS, thread_name_prefix="io"
+        )
+
+    @property
+    def loaded(self) -> List[LoadedModel]:
+        return list(self._models.values())
+
+    def get(self, name: str) -> Optional[LoadedModel]:
+        return self._models.get(name)
+
+    def load(self, name: str) -> LoadedModel:
+        """Load ``name`` from outside the event loop, e.g. at start-up."""
+        model = self._models.get(name)
+        if model is None:
+            model = self._models[name] = self._build(name)
+        return model
+
+    @asynccontextmanager
+    async def use(self, name: Optional[str] = None) -> AsyncIterator[LoadedModel]:
+        """Hold model ``name`` (the default if None), loading it if needed."""
+        name = name or self.default
+        async with self._lock(name):
+            model = self._models.get(name)
+            if model is None:
+                loop = asyncio.get_running_loop()
+                model = await loop.run_in_executor(None, self._build, name)
+                self._models[name] = model
+            model.users += 1
+        self._models.move_to_end(name)
+        try:
+            await self._evict()
+            yield model
+        finally:
+            model.users -= 1
+            await self._evict()
+
+    async def unload(self, name: str, force: bool = False) -> bool:
+        """Unload ``name`` unless it is in use (or ``force``); True if it was."""
+        async with self._lock(name):
+            model = self._models.get(name)
+            if model is None or (model.users and not force):
+                return False
+            del self._models[name]
+            await model.classify_batcher.stop()
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, model.inference_executor.shutdown)
+            model.feature_db.stop_compaction()
+            model.manifest.close()
+        del model
+        gc.collect()
+        logger.info(f"Unloaded model {name}.")
+        return True
+
+    async def close(self):
+        for name in list(self._models):
+            await self.unload(name, force=True)
+        self.io_pool.shutdown()
+
+    def _lock(self, name: str) -> asyncio.Lock:
+        if name not in self.names:
+            raise ValueError(f"Unknown model '{name}', expected one of {self.names}")
+        return self._locks.setdefault(name, asyncio.Lock())
+
+    async def _evict(self):
+        if self.memory_budget <= 0:
+            return
+        sizes = {name: model.memory_bytes() for name, model in self._models.items()}
+        total = sum(sizes.values())
+        # Least recently used first
+        for name, model in list(self._models.items()):
+            if total <= self.memory_budget:
+                return
+            if name == self.default or model.users:
+                continue
+            if await self.unload(name):
+                total -= sizes[name]
+
+    def _build(self, name: str) -> LoadedModel:
+        if name not in self.names:
+            raise ValueError(f"Unknown model '{name}', expected one of {self.names}")
+        database_path = model_path(Settings.DATABASE_PATH, name)
+        if os.path.exists(Settings.DATABASE_PATH) and not os.path.exists(database_path):
+            logger.warning(
+                f"{Settings.DATABASE_PATH} predates per-model indexes and is not read; "
+                f"move it and its manifest under {os.path.dirname(database_path)} "
+                f"to reuse it for {name}."
+            )
+        try:
+            feature_extractor = dynamic_import("src.features", name)()
+        except Exception as e:
+            logger.error(f"Failed to load feature extractor {name}: {e}")
+            raise
+        feature_db = FeatureDatabase(
+            feature_dim=feature_extractor.feature_dim, database_path=database_path
+        )
+        manifest = Manifest(model_path(Settings.MANIFEST_PATH, name))
+        try:
+            # Only new, changed or deleted files cost anything on reload
+            sync_database(self.data_loader, feature_extractor, feature_db, manifest)
+        except Exception as e:
+            logger.error(f"Failed to sync the database of {name}: {e}")
+            manifest.close()
+            raise
+        feature_db.start_compaction()
+        similarity_search = SimilaritySearch(feature_db)
+        inference_executor = InferenceExecutor(feature_extractor, io_pool=self.io_pool)
+        model_bytes = feature_extractor.memory_bytes()
+        if inference_executor.executor_type == "process":
+            model_bytes *= 1 + Settings.EXECUTOR_WORKERS
+        model = LoadedModel(
+            name=name,
+            feature_extractor=feature_extractor,
+            feature_db=feature_db,
+            manifest=manifest,
+            similarity_search=similarity_search,
+            classifier=Classifier(similarity_search),
+            inference_executor=inference_executor,
+            model_bytes=model_bytes,
+        )
+        model.classify_batcher = MicroBatcher(partial(self._classify_batch, model))
+        logger.info(
+            f"Loaded model {name} using about {model.memory_bytes() / 2**20:.0f} MB."
+        )
+        return model
@@ -1,17 +1,45 @@
+import asyncio
+import io
+import json
 import os
-from typing import List
+import threading
+from functools import partial
+from itertools import chain, islice
+from typing import AsyncIterator, BinaryIO, Iterator, List, Optional, Tuple
 import shutil
-import uuid
-from fastapi import File, UploadFile, Form, HTTPException, APIRouter
+import tempfile
 import numpy as np
+from PIL import Image, UnidentifiedImageError
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Form,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+)
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
 from src.config.settings import Settings
+from src.data.archive import iter_archive_images
 from src.data.data_loader import DataLoader
-from src.database.feature_database import FeatureDatabase
-from src.search.similarity_search import SimilaritySearch
-from src.classifier.classifier import Classifier
-from src.utils.logger import logger
-from src.utils.helpers import load_image, dynamic_import
+from src.data.manifest import ManifestEntry
+from src.classifier.classifier import Prediction
+from src.api.ingest import IngestionQueue, IngestJob
+from src.api.registry import LoadedModel, ModelRegistry
+from src.api.vectors import encode_vectors, neighbors_to_dicts, parse_vectors
+from src.utils.logger import logger, sampled
+from src.utils.metrics import render as render_metrics, time_stage
+from src.utils.helpers import FORMAT_EXTENSIONS, load_image, file_digest
+
+# Uploads copied for a streamed response stay in memory up to this size
+_SPOOL_MAX_BYTES = 1024 * 1024
+
+# Set once the components below are built; until then most routes return 503
+_ready = threading.Event()
+_startup_error: Optional[str] = None
 
 
 class TestTimeRouter:
@@ -21,73 +49,357 @@ class TestTimeRouter:
 
     @staticmethod
     def startup_event():
-        global data_loader, feature_extractor, feature_db, similarity_search, classifier
+        """Build the API components, on a background thread if BACKGROUND_STARTUP.
+
+        In the background the server starts answering /health straight away,
+        and /ready turns 200 once the model is loaded and the database synced.
+        """
+        if Settings.BACKGROUND_STARTUP:
+            threading.Thread(
+                target=TestTimeRouter._initialize,
+                args=(False,),
+                name="startup",
+                daemon=True,
+            ).start()
+        else:
+            TestTimeRouter._initialize(True)
+
+    @staticmethod
+    def _initialize(raise_errors: bool):
+        global _startup_error
+        try:
+            TestTimeRouter._build_components()
+        except Exception as e:
+            _startup_error = getattr(e, "detail", str(e))
+            logger.error(f"API start-up failed: {_startup_error}")
+            if raise_errors:
+                raise
+            return
+        _ready.set()
+
+    @staticmethod
+    def _build_components():
+        global data_loader, registry, ingestion_queue
 
         logger.info("Initializing Test-Time Compute Classifier API components.")
 
         data_loader = DataLoader(Settings.DATA_PATH)
+        registry = ModelRegistry(
+            data_loader,
+            TestTimeRouter._classify_batch,
+            default=Settings.FEATURE_MODEL,
+            models=Settings.MODELS,
+            memory_budget_mb=Settings.MODEL_MEMORY_MB,
+        )
+        ingestion_queue = IngestionQueue(TestTimeRouter._ingest)
 
+        # Other models load on their first request
         try:
-            feature_extractor = dynamic_import("src.features", Settings.FEATURE_MODEL)()
-        except Exception as e:
-            logger.error(f"Failed to load feature extractor: {e}")
+            registry.load(registry.default)
+        except Exception:
             raise HTTPException(
-                status_code=500, detail="Failed to load feature extractor."
+                status_code=500, detail=f"Failed to load model {registry.default}."
             )
-        feature_db = FeatureDatabase(feature_dim=feature_extractor.feature_dim)
-        similarity_search = SimilaritySearch(feature_db)
-        classifier = Classifier(similarity_search)
+        logger.info("API components initialized successfully.")
+
+    @staticmethod
+    async def shutdown_event():
+        if not _ready.is_set():
+            logger.info("Shutting down before API components were ready.")
+            return
+        await ingestion_queue.stop()
+        await registry.close()
+        logger.info("API components shut down.")
+
+    @staticmethod
+    async def _classify_batch(
+        loaded: LoadedModel, items: List[Tuple[Image.Image, str]]
+    ) -> List[Prediction]:
+        images, digests = zip(*items)
+        features_np = await loaded.inference_executor.extract(
+            list(images), list(digests)
+        )
+        # Keep every voted class; each request trims to its own top_n
+        return await loaded.inference_executor.run_search(
+            loaded.classifier.predict_detailed,
+            features_np,
+            Settings.K_NEIGHBORS,
+            Settings.K_NEIGHBORS,
+        )
+
+    @staticmethod
+    async def _run_io(fn, *args):
+        """Run blocking file work on the I/O pool shared by all models."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(registry.io_pool, partial(fn, *args))
+
+    @staticmethod
+    def _digest_upload(file: BinaryIO) -> str:
+        with time_stage("upload_read"):
+            return file_digest(file)
+
+    @staticmethod
+    def _decode_upload(file: BinaryIO) -> Tuple[Optional[Image.Image], str]:
+        digest = TestTimeRouter._digest_upload(file)
+        with time_stage("decode"):
+            return load_image(file), digest
+
+    @staticmethod
+    def _decode_next(
+        sources: Iterator[Tuple[str, BinaryIO]], count: int
+    ) -> List[Tuple[str, Optional[Image.Image], str]]:
+        return [
+            (name, *TestTimeRouter._decode_upload(stream))
+            for name, stream in islice(sources, count)
+        ]
 
-        # Check database file is missing
-        if not os.path.exists(Settings.DATABASE_PATH):
-            logger.info(
-                f"Data directory found at: {Settings.DATA_PATH}, creating feature database."
+    @staticmethod
+    def _save_upload(file: UploadFile, class_dir: str, digest: str) -> Optional[str]:
+        # Only the header is parsed here; the ingestion worker decodes in full
+        try:
+            image_format = Image.open(file.file).format
+        except (UnidentifiedImageError, OSError):
+            return None
+        # Sync only indexes extensions it recognises, whatever the client sent
+        file_extension = FORMAT_EXTENSIONS.get(image_format)
+        if file_extension is None:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported image format {image_format} in '{file.filename}'; "
+                f"use one of {', '.join(sorted(FORMAT_EXTENSIONS))}.",
             )
+        file.file.seek(0)
+        # Name files by content hash so re-uploads of the same bytes are detected
+        unique_filename = f"{digest}{file_extension}"
+        file_path = os.path.join(class_dir, unique_filename)
+        with time_stage("upload_write"), open(file_path, "wb") as buffer:
+            shutil.copyfileobj(file.file, buffer)
+        return unique_filename
 
-            # Load data from Dataloader
-            image_paths, labels = data_loader.load_data()
+    @staticmethod
+    def _load_saved(paths: List[str]) -> List[Optional[Image.Image]]:
+        images = []
+        for path in paths:
+            full_path = os.path.join(Settings.DATA_PATH, path)
+            with time_stage("decode"):
+                image = load_image(full_path)
+            if image is None and os.path.exists(full_path):
+                os.remove(full_path)
+            images.append(image)
+        return images
 
-            # Trigger preprocessing to extract features and update the database
-            try:
-                feature_vectors = []
-                valid_labels = []
-                for image, label in zip(image_paths, labels):
-                    if image is not None:
-                        feat = feature_extractor(image)
-                        if feat.size > 0:
-                            feature_vectors.append(feat)
-                            valid_labels.append(label)
-                        else:
-                            logger.warning(
-                                "Feature extraction failed for an uploaded image."
-                            )
-                if feature_vectors:
-                    features_np = np.array(feature_vectors).astype("float32")
-                    feature_db.add_features(features_np, valid_labels)
-                    feature_db.save_database()
-                    logger.info("Uploaded images processed and database updated.")
-                else:
-                    logger.warning("No valid features extracted from uploaded images.")
-            except Exception as e:
-                logger.error(
-                    f"Failed during feature extraction and database update: {e}"
+    @staticmethod
+    async def _ingest(jobs: List[IngestJob]):
+        """Decode the files of several jobs once, then embed and index them per model.
+
+        Every loaded model indexes the files, each with one add and one save;
+        models that are not loaded pick them up when their next load syncs.
+        """
+        owners = [job for job in jobs for _ in job.paths]
+        paths = [path for job in jobs for path in job.paths]
+        digests = [digest for job in jobs for digest in job.digests]
+        images = await TestTimeRouter._run_io(TestTimeRouter._load_saved, paths)
+        valid = []
+        for i, (job, path, image) in enumerate(zip(owners, paths, images)):
+            if image is None:
+                logger.warning(f"Skipping undecodable upload '{path}'.")
+                job.invalid.append(os.path.basename(path))
+            else:
+                valid.append(i)
+        if not valid:
+            return
+        for name in [loaded.name for loaded in registry.loaded]:
+            async with registry.use(name) as loaded:
+                features_np = await loaded.inference_executor.extract(
+                    [images[i] for i in valid], [digests[i] for i in valid]
                 )
-                raise HTTPException(
-                    status_code=500, detail="Failed to process uploaded images."
+                await loaded.inference_executor.run_index(
+                    TestTimeRouter._add_and_save,
+                    loaded,
+                    features_np,
+                    [owners[i].class_name for i in valid],
+                    [paths[i] for i in valid],
+                    [digests[i] for i in valid],
                 )
+        for i in valid:
+            owners[i].added += 1
+        logger.info(f"Indexed {len(valid)} uploaded images from {len(jobs)} jobs.")
 
-        logger.info("API components initialized successfully.")
+    @staticmethod
+    def _add_and_save(
+        loaded: LoadedModel,
+        features: np.ndarray,
+        labels: List[str],
+        paths: List[str],
+        digests: List[str],
+    ):
+        # A model that loaded meanwhile may already have the files from its sync
+        new = [i for i, path in enumerate(paths) if loaded.manifest.get(path) is None]
+        if not new:
+            return
+        ids = loaded.feature_db.add_features(features[new], [labels[i] for i in new])
+        loaded.feature_db.save_database()
+        entries = []
+        for vector_id, i in zip(ids.tolist(), new):
+            stat = os.stat(os.path.join(Settings.DATA_PATH, paths[i]))
+            entries.append(
+                ManifestEntry(
+                    paths[i],
+                    labels[i],
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                    digests[i],
+                    vector_id,
+                )
+            )
+        loaded.manifest.upsert(entries)
+
+    @staticmethod
+    def _remove_class(loaded: LoadedModel, class_name: str) -> int:
+        removed = loaded.feature_db.remove_class(class_name)
+        loaded.feature_db.save_database()
+        entries = loaded.manifest.by_label(class_name)
+        loaded.manifest.remove([entry.path for entry in entries])
+        return removed
+
+    @staticmethod
+    def _remove_image(loaded: LoadedModel, path: str) -> int:
+        entry = loaded.manifest.get(path)
+        removed = 0
+        if entry is not None and entry.vector_id >= 0:
+            removed = loaded.feature_db.remove_ids(np.array([entry.vector_id]))
+            loaded.feature_db.save_database()
+        loaded.manifest.remove([path])
+        return removed
+
+    @staticmethod
+    def _rename_class(loaded: LoadedModel, class_name: str, new_name: str) -> int:
+        relabelled = loaded.feature_db.relabel_class(class_name, new_name)
+        loaded.feature_db.save_database()
+        entries = loaded.manifest.by_label(class_name)
+        loaded.manifest.remove([entry.path for entry in entries])
+        for entry in entries:
+            entry.path = os.path.join(new_name, os.path.basename(entry.path))
+            entry.label = new_name
+        loaded.manifest.upsert(entries)
+        return relabelled
+
+    @staticmethod
+    async def _update_loaded(fn, *args) -> int:
+        """Apply an index change to every loaded model; returns the default's count.
+
+        Models that are not loaded catch up from the data directory when
+        their next load syncs.
+        """
+        counts = {}
+        for name in [loaded.name for loaded in registry.loaded]:
+            async with registry.use(name) as loaded:
+                counts[name] = await loaded.inference_executor.run_index(
+                    fn, loaded, *args
+                )
+        return counts.get(registry.default, 0)
+
+    @staticmethod
+    def _search(
+        loaded: LoadedModel, vectors: np.ndarray, k: int
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Labels must come from the generation the neighbours were found in
+        snapshot = loaded.similarity_search.snapshot
+        distances, ids = loaded.similarity_search.find_similar(vectors, k, snapshot)
+        return distances, ids, snapshot.names_for(ids)
+
+    @staticmethod
+    async def _read_vectors(request: Request, feature_dim: int) -> np.ndarray:
+        try:
+            vectors = parse_vectors(
+                await request.body(),
+                request.headers.get("content-type", ""),
+                feature_dim,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if len(vectors) > Settings.MAX_BATCH_IMAGES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"At most {Settings.MAX_BATCH_IMAGES} vectors per request.",
+            )
+        return vectors
+
+    @staticmethod
+    def _require_ready():
+        if not _ready.is_set():
+            raise HTTPException(
+                status_code=503,
+                detail="API components are not ready yet.",
+                headers={"Retry-After": "5"},
+            )
+
+    @staticmethod
+    def _check_model(model: Optional[str]) -> str:
+        model = model or registry.default
+        if model not in registry.names:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Unknown model '{model}', expected one of {registry.names}.",
+            )
+        return model
+
+    @staticmethod
+    def _check_name(name: str):
+        # Names come from the URL; keep them inside the data directory
+        if not name or name in (".", "..") or os.path.basename(name) != name:
+            raise HTTPException(status_code=400, detail=f"Invalid name '{name}'.")
 
     def _setup_routes(self):
         """Set up routes for the Test-Time Compute Classifier API."""
+        ready = [Depends(self._require_ready)]
         self.router.get("/", summary="API index", description="API index endpoint.")(
             self.index
         )
         self.router.post("/add_class", summary="Add class")(self.add_class)
-        self.router.post("/upload_images", summary="Upload images")(self.upload_images)
-        self.router.post("/classify", summary="Classify image")(self.classify_image)
-        self.router.get("/classes", summary="List classes")(self.list_classes)
+        self.router.post("/upload_images", summary="Upload images", dependencies=ready)(
+            self.upload_images
+        )
+        self.router.get(
+            "/jobs/{job_id}", summary="Ingestion job status", dependencies=ready
+        )(self.get_job)
+        self.router.post("/classify", summary="Classify image", dependencies=ready)(
+            self.classify_image
+        )
+        self.router.post(
+            "/classify_batch", summary="Classify many images", dependencies=ready
+        )(self.classify_batch)
+        self.router.post("/embed", summary="Embed images", dependencies=ready)(
+            self.embed
+        )
+        self.router.post(
+            "/search", summary="Nearest neighbours of vectors", dependencies=ready
+        )(self.search)
+        self.router.post(
+            "/classify_embedding",
+            summary="Classify feature vectors",
+            dependencies=ready,
+        )(self.classify_embedding)
+        self.router.get("/classes", summary="List classes", dependencies=ready)(
+            self.list_classes
+        )
+        self.router.get("/models", summary="List models", dependencies=ready)(
+            self.list_models
+        )
+        self.router.delete(
+            "/classes/{class_name}", summary="Delete class", dependencies=ready
+        )(self.delete_class)
+        self.router.post(
+            "/classes/{class_name}/rename", summary="Rename class", dependencies=ready
+        )(self.rename_class)
+        self.router.delete(
+            "/classes/{class_name}/images/{filename}",
+            summary="Delete image",
+            dependencies=ready,
+        )(self.delete_image)
         self.router.get("/health", summary="Health check")(self.health_check)
+        self.router.get("/ready", summary="Readiness check")(self.readiness_check)
+        self.router.get("/metrics", summary="Prometheus metrics")(self.metrics)
 
     def index(self):
         return {"message": "Test-Time Compute Classifier API is running."}
@@ -108,8 +420,15 @@ class TestTimeRouter:
             raise HTTPException(status_code=500, detail="Internal Server Error.")
 
     async def upload_images(
-        self, class_name: str = Form(...), files: List[UploadFile] = File(...)
+        self,
+        class_name: str = Form(...),
+        files: List[UploadFile] = File(...),
+        wait: bool = Query(False),
     ):
+        """Save the images and queue them for indexing; poll ``/jobs/{job_id}``.
+
+        With ``wait`` the response is sent once the job has finished.
+        """
         class_dir = os.path.join(Settings.DATA_PATH, class_name)
         if not os.path.exists(class_dir):
             logger.warning(f"Class '{class_name}' does not exist.")
@@ -118,16 +437,34 @@ class TestTimeRouter:
             )
 
         saved_files = []
+        digests = []
+        duplicates = invalid = 0
         for file in files:
-            # Generate a unique filename to prevent overwriting
-            file_extension = os.path.splitext(file.filename)[1]
-            unique_filename = f"{uuid.uuid4().hex}{file_extension}"
-            file_path = os.path.join(class_dir, unique_filename)
             try:
-                with open(file_path, "wb") as buffer:
-                    shutil.copyfileobj(file.file, buffer)
-                saved_files.append(unique_filename)
-                logger.info(f"Saved image {unique_filename} to class '{class_name}'.")
+                digest = await self._run_io(self._digest_upload, file.file)
+                # The default model is never unloaded, so its manifest sees every file
+                existing = await self._run_io(
+                    registry.get(registry.default).manifest.find_digest, digest
+                )
+                if (
+                    existing is not None
+                    or digest in digests
+                    or ingestion_queue.is_pending(digest)
+                ):
+                    logger.info(
+                        f"Skipping duplicate image '{file.filename}' "
+                        f"(already stored as {existing.path if existing else 'part of a pending upload'})."
+                    )
+                    duplicates += 1
+                    continue
+                unique_filename = await self._run_io(
+                    self._save_upload, file, class_dir, digest
+                )
+            except HTTPException:
+                # Nothing is queued for a rejected request, so drop what was saved
+                for path in saved_files:
+                    os.remove(os.path.join(Settings.DATA_PATH, path))
+                raise
             except Exception as e:
                 logger.error(f"Failed to save image '{file.filename}': {e}")
                 raise HTTPException(
@@ -135,92 +472,414 @@ class TestTimeRouter:
                 )
             finally:
                 file.file.close()
+            if unique_filename is None:
+                logger.warning(f"Skipping invalid image '{file.filename}'.")
+                invalid += 1
+                continue
+            saved_files.append(os.path.join(class_name, unique_filename))
+            digests.append(digest)
 
-        # Trigger preprocessing to extract features and update the database
-        try:
-            image_objects = [
-                load_image(os.path.join(class_dir, fname)) for fname in saved_files
-            ]
-            feature_vectors = []
-            valid_labels = []
-            for image in image_objects:
-                if image is not None:
-                    feat = feature_extractor.extract(image)
-                    if feat.size > 0:
-                        feature_vectors.append(feat)
-                        valid_labels.append(class_name)
-                    else:
-                        logger.warning(
-                            "Feature extraction failed for an uploaded image."
-                        )
-            if feature_vectors:
-                features_np = np.array(feature_vectors).astype("float32")
-                feature_db.add_features(features_np, valid_labels)
-                feature_db.save_database()
-                logger.info("Uploaded images processed and database updated.")
-            else:
-                logger.warning("No valid features extracted from uploaded images.")
-        except Exception as e:
-            logger.error(f"Failed during feature extraction and database update: {e}")
-            raise HTTPException(
-                status_code=500, detail="Failed to process uploaded images."
+        job = IngestJob(class_name, saved_files, digests, duplicates)
+        if not saved_files:
+            logger.warning("No valid images in the upload.")
+            result = job.to_dict()
+            result.update(job_id=None, status="done")
+        else:
+            ingestion_queue.submit(job)
+            if wait:
+                await job.done.wait()
+            if job.status == "failed":
+                raise HTTPException(
+                    status_code=500, detail="Failed to process uploaded images."
+                )
+            result = job.to_dict()
+        result["rejected"] = invalid
+        if result["status"] == "done":
+            result["message"] = (
+                f"Uploaded {job.added} images to class '{class_name}' successfully."
             )
+            return result
+        result["message"] = (
+            f"Queued {len(saved_files)} images for class '{class_name}'."
+        )
+        return JSONResponse(result, status_code=202)
 
-        return {
-            "message": f"Uploaded {len(saved_files)} images to class '{class_name}' successfully."
-        }
+    async def get_job(self, job_id: str):
+        job = ingestion_queue.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found.")
+        return job.to_dict()
 
-    async def classify_image(self, file: UploadFile = File(...)):
-        # Save the uploaded image to a temporary location
-        temp_dir = "temp_uploads"
-        os.makedirs(temp_dir, exist_ok=True)
-        temp_filename = f"{uuid.uuid4().hex}_{file.filename}"
-        temp_path = os.path.join(temp_dir, temp_filename)
+    async def classify_image(
+        self,
+        file: UploadFile = File(...),
+        top_n: int = Query(Settings.TOP_N, ge=1),
+        model: Optional[str] = Query(None),
+    ):
+        model = self._check_model(model)
+        # Decode the upload in memory, straight from the spooled request body
         try:
-            with open(temp_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-            logger.info(f"Saved uploaded image to temporary path: {temp_path}")
-        except Exception as e:
-            logger.error(f"Failed to save uploaded image: {e}")
-            raise HTTPException(
-                status_code=500, detail="Failed to save uploaded image."
-            )
+            image, digest = await self._run_io(self._decode_upload, file.file)
         finally:
             file.file.close()
-
-        # Load and process the image
-        image = load_image(temp_path)
         if image is None:
-            shutil.rmtree(temp_dir)
             logger.error("Failed to load the uploaded image.")
             raise HTTPException(status_code=400, detail="Invalid image file.")
 
-        # Extract features
+        # Extract features and classify together with concurrent requests
         try:
-            feature_vector = feature_extractor(image)
-            if feature_vector.size == 0:
-                shutil.rmtree(temp_dir)
-                logger.error("Feature extraction returned empty vector.")
-                raise HTTPException(
-                    status_code=500, detail="Failed to extract features from the image."
+            async with registry.use(model) as loaded:
+                prediction = await loaded.classify_batcher.submit((image, digest))
+            if sampled("classify"):
+                logger.info(
+                    "Image classified by {} as: {} with confidence {:.2f}",
+                    model,
+                    prediction.label,
+                    prediction.confidence,
                 )
-            feature_np = feature_vector.reshape(1, -1).astype("float32")
-            # Perform classification
-            prediction = classifier.predict(feature_np, Settings.K_NEIGHBORS)
-            logger.info(f"Image classified as: {prediction}")
         except Exception as e:
             logger.error(f"Failed during classification: {e}")
-            shutil.rmtree(temp_dir)
             raise HTTPException(status_code=500, detail="Failed to classify the image.")
 
-        # Clean up temporary files
-        shutil.rmtree(temp_dir)
+        return prediction.to_dict(top_n)
+
+    async def classify_batch(
+        self,
+        files: List[UploadFile] = File(None),
+        archive: Optional[UploadFile] = File(None),
+        top_n: int = Query(Settings.TOP_N, ge=1),
+        model: Optional[str] = Query(None),
+    ):
+        """Classify uploaded files and/or the images in a zip or tar archive.
+
+        Results are streamed as NDJSON, one object per image in input order,
+        with the image's ``filename`` or an ``error``.
+        """
+        model = self._check_model(model)
+        files = files or []
+        if not files and archive is None:
+            raise HTTPException(status_code=400, detail="No images uploaded.")
+        if len(files) > Settings.MAX_BATCH_IMAGES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"At most {Settings.MAX_BATCH_IMAGES} images per request.",
+            )
+        uploads = files + ([archive] if archive is not None else [])
+        copies = await self._run_io(self._copy_uploads, uploads)
+        sources = chain(
+            ((file.filename, copy) for file, copy in zip(files, copies)),
+            self._archive_sources(copies[-1]) if archive is not None else (),
+        )
+        return StreamingResponse(
+            self._stream_predictions(model, sources, top_n, copies),
+            media_type="application/x-ndjson",
+        )
+
+    @staticmethod
+    def _copy_uploads(uploads: List[UploadFile]) -> List[BinaryIO]:
+        """Copies of ``uploads`` owned by the caller.
+
+        FastAPI closes form files when the endpoint returns, before the body
+        of a streamed response is produced, so that body cannot read them.
+        """
+        copies = []
+        try:
+            for upload in uploads:
+                copy = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_BYTES)
+                copies.append(copy)
+                shutil.copyfileobj(upload.file, copy)
+                copy.seek(0)
+        except Exception:
+            for copy in copies:
+                copy.close()
+            raise
+        return copies
+
+    @staticmethod
+    def _archive_sources(archive: BinaryIO) -> Iterator[Tuple[str, BinaryIO]]:
+        members = iter_archive_images(archive)
+        for count, (name, data) in enumerate(members):
+            if count >= Settings.MAX_BATCH_IMAGES:
+                raise ValueError(
+                    f"At most {Settings.MAX_BATCH_IMAGES} images per request."
+                )
+            yield name, io.BytesIO(data)
+
+    async def _stream_predictions(
+        self,
+        model: str,
+        sources: Iterator[Tuple[str, BinaryIO]],
+        top_n: int,
+        uploads: List[BinaryIO],
+    ) -> AsyncIterator[bytes]:
+        try:
+            async with registry.use(model) as loaded:
+                while True:
+                    # Decode one model batch at a time so results stream as they finish
+                    chunk = await self._run_io(
+                        self._decode_next, sources, Settings.BATCH_SIZE
+                    )
+                    if not chunk:
+                        break
+                    valid = [
+                        (image, digest)
+                        for _, image, digest in chunk
+                        if image is not None
+                    ]
+                    predictions = iter(
+                        await self._classify_batch(loaded, valid) if valid else []
+                    )
+                    lines = []
+                    for name, image, _ in chunk:
+                        if image is None:
+                            result = {"filename": name, "error": "Invalid image file."}
+                        else:
+                            prediction = next(predictions).to_dict(top_n)
+                            result = {"filename": name, **prediction}
+                        lines.append(json.dumps(result) + "\n")
+                    yield "".join(lines).encode("utf-8")
+        except Exception as e:
+            # Headers are already sent; report the failure in-band
+            logger.error(f"Failed during batch classification: {e}")
+            yield (json.dumps({"error": str(e)}) + "\n").encode("utf-8")
+        finally:
+            for upload in uploads:
+                upload.close()
+
+    async def embed(
+        self,
+        files: List[UploadFile] = File(...),
+        encoding: str = Query("json", pattern="^(json|base64|binary)$"),
+        model: Optional[str] = Query(None),
+    ):
+        """Feature vectors for the uploaded images, as JSON lists, base64 or raw float32."""
+        model = self._check_model(model)
+        decoded = []
+        try:
+            if len(files) > Settings.MAX_BATCH_IMAGES:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"At most {Settings.MAX_BATCH_IMAGES} images per request.",
+                )
+            for file in files:
+                image, digest = await self._run_io(self._decode_upload, file.file)
+                if image is None:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Invalid image file '{file.filename}'.",
+                    )
+                decoded.append((image, digest))
+        finally:
+            for file in files:
+                file.file.close()
 
-        return {"prediction": prediction}
+        images, digests = zip(*decoded)
+        try:
+            async with registry.use(model) as loaded:
+                features_np = await loaded.inference_executor.extract(
+                    list(images), list(digests)
+                )
+        except Exception as e:
+            logger.error(f"Failed during feature extraction: {e}")
+            raise HTTPException(status_code=500, detail="Failed to embed the images.")
+
+        embeddings = encode_vectors(features_np, encoding)
+        if encoding == "binary":
+            return Response(
+                content=embeddings,
+                media_type="application/octet-stream",
+                headers={"X-Feature-Dim": str(features_np.shape[1])},
+            )
+        return {
+            "model": model,
+            "dimension": features_np.shape[1],
+            "embeddings": embeddings,
+        }
+
+    async def search(
+        self,
+        request: Request,
+        k: int = Query(Settings.K_NEIGHBORS, ge=1, le=Settings.MAX_SEARCH_K),
+        model: Optional[str] = Query(None),
+    ):
+        """Nearest stored vectors, with labels and source images, for each query vector."""
+        model = self._check_model(model)
+        async with registry.use(model) as loaded:
+            vectors = await self._read_vectors(request, loaded.feature_db.feature_dim)
+            try:
+                distances, ids, labels = await loaded.inference_executor.run_search(
+                    self._search, loaded, vectors, k
+                )
+                images = await self._run_io(
+                    loaded.manifest.paths_for, np.unique(ids[ids >= 0]).tolist()
+                )
+            except Exception as e:
+                logger.error(f"Failed during similarity search: {e}")
+                raise HTTPException(status_code=500, detail="Failed to search.")
+        return {"results": neighbors_to_dicts(distances, ids, labels, images)}
+
+    async def classify_embedding(
+        self,
+        request: Request,
+        top_n: int = Query(Settings.TOP_N, ge=1),
+        model: Optional[str] = Query(None),
+    ):
+        """Classify precomputed feature vectors without a forward pass."""
+        model = self._check_model(model)
+        async with registry.use(model) as loaded:
+            vectors = await self._read_vectors(request, loaded.feature_db.feature_dim)
+            try:
+                predictions = await loaded.inference_executor.run_search(
+                    loaded.classifier.predict_detailed,
+                    vectors,
+                    Settings.K_NEIGHBORS,
+                    Settings.K_NEIGHBORS,
+                )
+            except Exception as e:
+                logger.error(f"Failed during classification: {e}")
+                raise HTTPException(status_code=500, detail="Failed to classify.")
+        return {"predictions": [p.to_dict(top_n) for p in predictions]}
 
     async def list_classes(self):
         classes = data_loader.classes
         return {"classes": classes}
 
+    async def list_models(self):
+        """Models that can be requested, and what the loaded ones hold."""
+        models = []
+        for name in registry.names:
+            loaded = registry.get(name)
+            info = {"name": name, "default": name == registry.default}
+            info["loaded"] = loaded is not None
+            if loaded is not None:
+                info.update(
+                    dimension=loaded.feature_db.feature_dim,
+                    vectors=loaded.feature_db.snapshot.ntotal,
+                    memory_bytes=loaded.memory_bytes(),
+                    in_use=loaded.users,
+                )
+            models.append(info)
+        return {"models": models, "memory_budget_bytes": registry.memory_budget}
+
+    async def delete_class(self, class_name: str):
+        self._check_name(class_name)
+        class_dir = os.path.join(Settings.DATA_PATH, class_name)
+        if (
+            not os.path.isdir(class_dir)
+            and registry.get(registry.default).feature_db.label_store.class_id(
+                class_name
+            )
+            < 0
+        ):
+            raise HTTPException(
+                status_code=404, detail=f"Class '{class_name}' does not exist."
+            )
+        try:
+            # Files go first: if removing vectors fails, the next sync drops them
+            await self._run_io(shutil.rmtree, class_dir, True)
+            removed = await self._update_loaded(self._remove_class, class_name)
+            data_loader.refresh_classes()
+        except Exception as e:
+            logger.error(f"Failed to delete class '{class_name}': {e}")
+            raise HTTPException(status_code=500, detail="Internal Server Error.")
+        logger.info(f"Deleted class '{class_name}' and {removed} features.")
+        return {
+            "message": f"Class '{class_name}' deleted successfully.",
+            "removed": removed,
+        }
+
+    async def rename_class(self, class_name: str, new_name: str = Form(...)):
+        self._check_name(class_name)
+        self._check_name(new_name)
+        class_dir = os.path.join(Settings.DATA_PATH, class_name)
+        new_dir = os.path.join(Settings.DATA_PATH, new_name)
+        if not os.path.isdir(class_dir):
+            raise HTTPException(
+                status_code=404, detail=f"Class '{class_name}' does not exist."
+            )
+        if os.path.exists(new_dir):
+            raise HTTPException(
+                status_code=400, detail=f"Class '{new_name}' already exists."
+            )
+        try:
+            await self._run_io(os.rename, class_dir, new_dir)
+            relabelled = await self._update_loaded(
+                self._rename_class, class_name, new_name
+            )
+            data_loader.refresh_classes()
+        except Exception as e:
+            logger.error(f"Failed to rename class '{class_name}': {e}")
+            raise HTTPException(status_code=500, detail="Internal Server Error.")
+        logger.info(f"Renamed class '{class_name}' to '{new_name}'.")
+        return {
+            "message": f"Class '{class_name}' renamed to '{new_name}' successfully.",
+            "relabelled": relabelled,
+        }
+
+    async def delete_image(self, class_name: str, filename: str):
+        self._check_name(class_name)
+        self._check_name(filename)
+        path = os.path.join(class_name, filename)
+        file_path = os.path.join(Settings.DATA_PATH, path)
+        manifest = registry.get(registry.default).manifest
+        if not os.path.isfile(file_path) and manifest.get(path) is None:
+            raise HTTPException(
+                status_code=404, detail=f"Image '{path}' does not exist."
+            )
+        try:
+            if os.path.isfile(file_path):
+                await self._run_io(os.remove, file_path)
+            removed = await self._update_loaded(self._remove_image, path)
+        except Exception as e:
+            logger.error(f"Failed to delete image '{path}': {e}")
+            raise HTTPException(status_code=500, detail="Internal Server Error.")
+        logger.info(f"Deleted image '{path}'.")
+        return {"message": f"Image '{path}' deleted successfully.", "removed": removed}
+
     async def health_check(self):
         return {"status": "API is running successfully."}
+
+    async def metrics(self):
+        gauges = {}
+        if _ready.is_set():
+            loaded = registry.loaded
+            cached = [m for m in loaded if m.feature_extractor.cache is not None]
+
+            def by_model(models, value):
+                return {(("model", m.name),): value(m) for m in models}
+
+            gauges["ttc_loaded_models"] = ("Models currently loaded.", len(loaded))
+            gauges["ttc_model_memory_bytes"] = (
+                "Estimated memory held by each loaded model and its index.",
+                by_model(loaded, lambda m: m.memory_bytes()),
+            )
+            gauges["ttc_database_vectors"] = (
+                "Vectors in each model's feature database.",
+                by_model(loaded, lambda m: m.feature_db.snapshot.ntotal),
+            )
+            gauges["ttc_database_generation"] = (
+                "Generation of each model's published index snapshot.",
+                by_model(loaded, lambda m: m.feature_db.snapshot.generation),
+            )
+            gauges["ttc_feature_cache_hits"] = (
+                "Feature cache hits.",
+                by_model(cached, lambda m: m.feature_extractor.cache.hits),
+            )
+            gauges["ttc_feature_cache_misses"] = (
+                "Feature cache misses.",
+                by_model(cached, lambda m: m.feature_extractor.cache.misses),
+            )
+        return Response(
+            content=render_metrics(gauges),
+            media_type="text/plain; version=0.0.4; charset=utf-8",
+        )
+
+    async def readiness_check(self):
+        if _ready.is_set():
+            return {"status": "ready"}
+        detail = (
+            f"Start-up failed: {_startup_error}"
+            if _startup_error
+            else "Loading the model and syncing the database."
+        )
+        raise HTTPException(status_code=503, detail=detail)
@@ -0,0 +1,97 @@
+import base64
+import binascii
+import json
+from typing import Any, Dict, List, Union
+import numpy as np
+
+# Vectors on the wire are little-endian float32, row after row
+WIRE_DTYPE = np.dtype("<f4")
+
+
+def parse_vectors(body: bytes, content_type: str, feature_dim: int) -> np.ndarray:
+    """Decode a request body into a ``(n, feature_dim)`` float32 array.
+
+    ``application/octet-stream`` bodies are raw float32 rows. JSON bodies hold
+    ``"vector"`` (one list), ``"vectors"`` (a list of lists) or ``"base64"``
+    (base64 of raw float32 rows). Raises ``ValueError`` on malformed input.
+    """
+    if content_type.startswith("application/octet-stream"):
+        return _from_bytes(body, feature_dim)
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise ValueError("Body must be JSON or application/octet-stream.")
+    if not isinstance(payload, dict):
+        raise ValueError("JSON body must be an object.")
+    if "base64" in payload:
+        try:
+            raw = base64.b64decode(payload["base64"], validate=True)
+        except (binascii.Error, TypeError):
+            raise ValueError("Field 'base64' is not valid base64.")
+        return _from_bytes(raw, feature_dim)
+    if "vectors" in payload:
+        values = payload["vectors"]
+    elif "vector" in payload:
+        values = [payload["vector"]]
+    else:
+        raise ValueError("JSON body needs 'vector', 'vectors' or 'base64'.")
+    try:
+        vectors = np.asarray(values, dtype=np.float32)
+    except (TypeError, ValueError):
+        raise ValueError("Vectors must be lists of numbers.")
+    if vectors.ndim != 2 or vectors.shape[1] != feature_dim or not len(vectors):
+        raise ValueError(
+            f"Expected vectors of dimension {feature_dim}, got shape {vectors.shape}."
+        )
+    return _check_finite(vectors)
+
+
+def encode_vectors(
+    vectors: np.ndarray, encoding: str
+) -> Union[bytes, List[str], List[List[float]]]:
+    """Encode rows as raw bytes (``binary``), base64 strings or JSON lists."""
+    vectors = np.ascontiguousarray(vectors, dtype=WIRE_DTYPE)
+    if encoding == "binary":
+        return vectors.tobytes()
+    if encoding == "base64":
+        return [base64.b64encode(row.tobytes()).decode("ascii") for row in vectors]
+    return vectors.tolist()
+
+
+def neighbors_to_dicts(
+    distances: np.ndarray,
+    ids: np.ndarray,
+    labels: np.ndarray,
+    images: Dict[int, str],
+) -> List[List[Dict[str, Any]]]:
+    """Per query, the neighbours FAISS found (padding dropped)."""
+    return [
+        [
+            {
+                "id": int(vector_id),
+                "label": label,
+                "distance": float(distance),
+                "image": images.get(int(vector_id)),
+            }
+            for distance, vector_id, label in zip(row_d, row_i, row_l)
+            if vector_id >= 0
+        ]
+        for row_d, row_i, row_l in zip(distances, ids, labels)
+    ]
+
+
+def _from_bytes(raw: bytes, feature_dim: int) -> np.ndarray:
+    row_bytes = feature_dim * WIRE_DTYPE.itemsize
+    if not raw or len(raw) % row_bytes:
+        raise ValueError(
+            f"Binary vectors must be a non-empty multiple of {row_bytes} bytes "
+            f"({feature_dim} float32 values), got {len(raw)}."
+        )
+    vectors = np.frombuffer(raw, dtype=WIRE_DTYPE).reshape(-1, feature_dim)
+    return _check_finite(vectors.astype(np.float32))
+
+
+def _check_finite(vectors: np.ndarray) -> np.ndarray:
+    if not np.isfinite(vectors).all():
+        raise ValueError("Vectors must not contain NaN or infinity.")
+    return np.ascontiguousarray(vectors)
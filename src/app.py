@@ -4,6 +4,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from src.utils.logger import logger
+from src.utils.metrics import RequestTimer
 from src.api.routes import TestTimeRouter
 
 
@@ -20,6 +21,7 @@ async def lifespan(app: FastAPI):
     yield
 
     logger.info("Stopping Test-Time Compute Classifier API.")
+    await TestTimeRouter.shutdown_event()
 
 
 app = FastAPI(
@@ -43,6 +45,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(RequestTimer)
+
 test_time_router = TestTimeRouter()
 app.include_router(test_time_router.router)
 
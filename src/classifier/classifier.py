@@ -1,38 +1,230 @@
-from typing import List
-from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
 import numpy as np
+from src.database.label_store import UNKNOWN_LABEL
+from src.database.snapshot import IndexSnapshot
 from src.search.similarity_search import SimilaritySearch
 from src.utils.logger import logger
+from src.utils.metrics import time_stage
 from src.config.settings import Settings
 
+_DISTANCE_EPS = 1e-6
+
+
+@dataclass
+class ClassScore:
+    label: str
+    votes: int
+    vote_share: float
+    score: float
+
+
+@dataclass
+class Prediction:
+    label: str
+    # Share of the k neighbours that voted for ``label``
+    confidence: float
+    # Share of the inverse-distance weight that went to ``label``
+    score: float
+    distance: Optional[float]
+    is_unknown: bool
+    top_classes: List[ClassScore] = field(default_factory=list)
+
+    @classmethod
+    def unknown(cls) -> "Prediction":
+        return cls(UNKNOWN_LABEL, 0.0, 0.0, None, True)
+
+    def to_dict(self, top_n: Optional[int] = None) -> Dict[str, Any]:
+        result = {"prediction": self.label, **asdict(self)}
+        del result["label"]
+        result["top_classes"] = result["top_classes"][:top_n]
+        return result
+
 
 class Classifier:
-    def __init__(self, similarity_search: SimilaritySearch):
+    def __init__(
+        self,
+        similarity_search: SimilaritySearch,
+        weighted: bool = Settings.WEIGHTED_VOTING,
+        unknown_threshold: float = Settings.UNKNOWN_THRESHOLD,
+        max_distance: float = Settings.UNKNOWN_MAX_DISTANCE,
+    ):
         self.similarity_search = similarity_search
+        self.weighted = weighted
+        self.unknown_threshold = unknown_threshold
+        self.max_distance = max_distance
         logger.info("Classifier initialized.")
 
     def predict(self, query_features: np.ndarray, k: int = Settings.K_NEIGHBORS) -> str:
-        distances, indices = self.similarity_search.find_similar(query_features, k)
+        snapshot = self.similarity_search.snapshot
+        distances, indices = self.similarity_search.find_similar(
+            query_features, k, snapshot
+        )
         if indices.size == 0:
             logger.warning("No indices returned for prediction.")
-            return "Unknown"
-        labels = self.similarity_search.get_labels(indices)
-        most_common = Counter(labels).most_common(1)
-        predicted_label = most_common[0][0] if most_common else "Unknown"
-        logger.info(
-            f"Predicted label: {predicted_label} with confidence {most_common[0][1]} and distance {distances[0][0]}"
+            return UNKNOWN_LABEL
+        labels, scores = self.vote(distances[:1], indices[:1], snapshot)
+        logger.debug(
+            "Predicted label: {} with score {} and distance {}",
+            labels[0],
+            scores[0].max(initial=0),
+            distances[0][0],
         )
-        return predicted_label
+        return labels[0]
 
     def predict_batch(
         self, query_features: np.ndarray, k: int = Settings.K_NEIGHBORS
     ) -> List[str]:
-        distances, indices = self.similarity_search.find_similar(query_features, k)
-        predicted_labels = []
-        for idx in indices:
-            labels = self.similarity_search.get_labels([idx])
-            most_common = Counter(labels).most_common(1)
-            predicted_label = most_common[0][0] if most_common else "Unknown"
-            predicted_labels.append(predicted_label)
-        logger.info(f"Predicted labels for batch: {predicted_labels}")
+        snapshot = self.similarity_search.snapshot
+        distances, indices = self.similarity_search.find_similar(
+            query_features, k, snapshot
+        )
+        if indices.size == 0:
+            logger.warning("No indices returned for batch prediction.")
+            return [UNKNOWN_LABEL] * len(query_features)
+        predicted_labels, _ = self.vote(distances, indices, snapshot)
+        logger.debug("Predicted labels for batch of {}.", len(predicted_labels))
         return predicted_labels
+
+    def predict_detailed(
+        self,
+        query_features: np.ndarray,
+        k: int = Settings.K_NEIGHBORS,
+        top_n: int = Settings.TOP_N,
+    ) -> List[Prediction]:
+        """Predictions with vote shares, weighted scores and open-set rejection.
+
+        A query is reported as ``"Unknown"`` when its vote share is below
+        ``unknown_threshold`` or, if ``max_distance`` is set, when even its
+        nearest neighbour is further away than that.
+        """
+        snapshot = self.similarity_search.snapshot
+        distances, indices = self.similarity_search.find_similar(
+            query_features, k, snapshot
+        )
+        if indices.size == 0:
+            logger.warning("No indices returned for detailed prediction.")
+            return [Prediction.unknown() for _ in range(len(query_features))]
+        with time_stage("voting"):
+            return self._predictions(distances, indices, top_n, snapshot)
+
+    def _predictions(
+        self,
+        distances: np.ndarray,
+        indices: np.ndarray,
+        top_n: int,
+        snapshot: IndexSnapshot,
+    ) -> List[Prediction]:
+        class_ids = snapshot.class_ids_for(indices)
+        class_names = snapshot.class_names
+        num_classes = max(len(class_names), 1)
+        valid = class_ids >= 0
+        votes = self._tally(class_ids, valid.astype(np.float64), num_classes)
+        weighted = self._tally(
+            class_ids, self._inverse_distance(distances, valid), num_classes
+        )
+        first_rank = self._first_rank(class_ids, num_classes)
+        best = self._best(weighted if self.weighted else votes, first_rank)
+        num_valid = np.maximum(valid.sum(axis=1), 1)
+        total_weight = np.maximum(weighted.sum(axis=1), _DISTANCE_EPS)
+
+        predictions = []
+        for row, winner in enumerate(best):
+            if winner < 0:
+                predictions.append(Prediction.unknown())
+                continue
+            primary = weighted[row] if self.weighted else votes[row]
+            order = np.lexsort((first_rank[row], -primary))[:top_n]
+            top_classes = [
+                ClassScore(
+                    label=class_names[c],
+                    votes=int(votes[row, c]),
+                    vote_share=float(votes[row, c] / num_valid[row]),
+                    score=float(weighted[row, c] / total_weight[row]),
+                )
+                for c in order
+                if votes[row, c] > 0
+            ]
+            confidence = float(votes[row, winner] / num_valid[row])
+            nearest = float(distances[row][valid[row]].min())
+            is_unknown = confidence < self.unknown_threshold or (
+                self.max_distance > 0 and nearest > self.max_distance
+            )
+            predictions.append(
+                Prediction(
+                    label=UNKNOWN_LABEL if is_unknown else class_names[winner],
+                    confidence=confidence,
+                    score=float(weighted[row, winner] / total_weight[row]),
+                    distance=nearest,
+                    is_unknown=is_unknown,
+                    top_classes=top_classes,
+                )
+            )
+        return predictions
+
+    def vote(
+        self,
+        distances: np.ndarray,
+        indices: np.ndarray,
+        snapshot: Optional[IndexSnapshot] = None,
+    ) -> Tuple[List[str], np.ndarray]:
+        """Majority vote over a ``(batch, k)`` neighbour matrix.
+
+        Returns the winning label per query and a ``(batch, num_classes)``
+        score matrix whose columns follow the snapshot's ``class_names``.
+        Pass the snapshot the neighbours were found in; it defaults to the
+        current one. Votes are weighted by inverse distance when
+        ``weighted`` is set; ties go to the class whose nearest neighbour
+        ranks first.
+        """
+        snapshot = snapshot or self.similarity_search.snapshot
+        with time_stage("voting"):
+            class_ids = snapshot.class_ids_for(indices)
+            num_classes = max(snapshot.num_classes, 1)
+            valid = class_ids >= 0
+            if self.weighted:
+                weights = self._inverse_distance(distances, valid)
+            else:
+                weights = valid.astype(np.float64)
+            scores = self._tally(class_ids, weights, num_classes)
+            best = self._best(scores, self._first_rank(class_ids, num_classes))
+        # The trailing "Unknown" name makes class id -1 resolve to it
+        return snapshot.names[best].tolist(), scores[:, : snapshot.num_classes]
+
+    @staticmethod
+    def _inverse_distance(distances: np.ndarray, valid: np.ndarray) -> np.ndarray:
+        weights = 1.0 / (np.maximum(distances, 0).astype(np.float64) + _DISTANCE_EPS)
+        return np.where(valid, weights, 0.0)
+
+    @staticmethod
+    def _cells(class_ids: np.ndarray, num_classes: int) -> np.ndarray:
+        rows = np.repeat(np.arange(class_ids.shape[0]), class_ids.shape[1])
+        return rows * num_classes + np.maximum(class_ids, 0).ravel()
+
+    def _tally(
+        self, class_ids: np.ndarray, weights: np.ndarray, num_classes: int
+    ) -> np.ndarray:
+        batch = class_ids.shape[0]
+        return np.bincount(
+            self._cells(class_ids, num_classes),
+            weights=weights.ravel(),
+            minlength=batch * num_classes,
+        ).reshape(batch, num_classes)
+
+    def _first_rank(self, class_ids: np.ndarray, num_classes: int) -> np.ndarray:
+        """Rank of each class's nearest neighbour, ``k`` if it got no vote."""
+        batch, k = class_ids.shape
+        first_rank = np.full(batch * num_classes, k, dtype=np.int64)
+        valid = (class_ids >= 0).ravel()
+        ranks = np.tile(np.arange(k), batch)
+        np.minimum.at(
+            first_rank, self._cells(class_ids, num_classes)[valid], ranks[valid]
+        )
+        return first_rank.reshape(batch, -1)
+
+    @staticmethod
+    def _best(scores: np.ndarray, first_rank: np.ndarray) -> np.ndarray:
+        best_score = scores.max(axis=1, keepdims=True)
+        tied_rank = np.where(scores == best_score, first_rank, np.iinfo(np.int64).max)
+        best = tied_rank.argmin(axis=1)
+        return np.where(best_score[:, 0] > 0, best, -1)
@@ -1,6 +1,6 @@
 import os
 from dataclasses import dataclass
-from typing import ClassVar
+from typing import ClassVar, List
 
 
 @dataclass
@@ -10,6 +10,72 @@ class Settings:
     DATABASE_PATH: ClassVar[str] = os.getenv(
         "DATABASE_PATH", "./database/features.faiss"
     )
+    MANIFEST_PATH: ClassVar[str] = os.getenv(
+        "MANIFEST_PATH", DATABASE_PATH + ".manifest.db"
+    )
     LOGGING_LEVEL: ClassVar[str] = os.getenv("LOGGING_LEVEL", "INFO")
+    LOG_SAMPLE_EVERY: ClassVar[int] = int(os.getenv("LOG_SAMPLE_EVERY", 100))
     FEATURE_MODEL: ClassVar[str] = os.getenv("FEATURE_MODEL", "ResNetExtractor")
+    # Further extractors the API serves on request, comma-separated
+    MODELS: ClassVar[List[str]] = [
+        name for name in os.getenv("MODELS", "").split(",") if name
+    ]
+    # Evict idle models beyond this many megabytes (0: never evict)
+    MODEL_MEMORY_MB: ClassVar[float] = float(os.getenv("MODEL_MEMORY_MB", 0))
+    WEIGHTS_PATH: ClassVar[str] = os.getenv("WEIGHTS_PATH", "./weights")
+    ALLOW_WEIGHTS_DOWNLOAD: ClassVar[bool] = (
+        os.getenv("ALLOW_WEIGHTS_DOWNLOAD", "1") == "1"
+    )
+    BACKGROUND_STARTUP: ClassVar[bool] = os.getenv("BACKGROUND_STARTUP", "1") == "1"
     K_NEIGHBORS: ClassVar[int] = int(os.getenv("K_NEIGHBORS", 5))
+    WEIGHTED_VOTING: ClassVar[bool] = os.getenv("WEIGHTED_VOTING", "0") == "1"
+    MAX_SEARCH_K: ClassVar[int] = int(os.getenv("MAX_SEARCH_K", 1000))
+    TOP_N: ClassVar[int] = int(os.getenv("TOP_N", 3))
+    UNKNOWN_THRESHOLD: ClassVar[float] = float(os.getenv("UNKNOWN_THRESHOLD", 0))
+    UNKNOWN_MAX_DISTANCE: ClassVar[float] = float(os.getenv("UNKNOWN_MAX_DISTANCE", 0))
+    BATCH_SIZE: ClassVar[int] = int(os.getenv("BATCH_SIZE", 32))
+    INDEX_CHUNK_SIZE: ClassVar[int] = int(os.getenv("INDEX_CHUNK_SIZE", 4096))
+    SHARD_PATH: ClassVar[str] = os.getenv("SHARD_PATH", "./database/shards")
+    FEATURE_CACHE_SIZE: ClassVar[int] = int(os.getenv("FEATURE_CACHE_SIZE", 10000))
+    FEATURE_CACHE_TTL: ClassVar[float] = float(os.getenv("FEATURE_CACHE_TTL", 0))
+    FEATURE_CACHE_DIR: ClassVar[str] = os.getenv("FEATURE_CACHE_DIR", "")
+    FEATURE_CACHE_DISK_BYTES: ClassVar[int] = int(
+        os.getenv("FEATURE_CACHE_DISK_BYTES", 1 << 30)
+    )
+    INFERENCE_BACKEND: ClassVar[str] = os.getenv("INFERENCE_BACKEND", "eager")
+    CHANNELS_LAST: ClassVar[bool] = os.getenv("CHANNELS_LAST", "0") == "1"
+    TORCH_NUM_THREADS: ClassVar[int] = int(os.getenv("TORCH_NUM_THREADS", 0))
+    TORCH_INTEROP_THREADS: ClassVar[int] = int(os.getenv("TORCH_INTEROP_THREADS", 0))
+    BACKEND_TOLERANCE: ClassVar[float] = float(os.getenv("BACKEND_TOLERANCE", 0.02))
+    NUM_WORKERS: ClassVar[int] = int(os.getenv("NUM_WORKERS", 4))
+    PREFETCH_BATCHES: ClassVar[int] = int(os.getenv("PREFETCH_BATCHES", 2))
+    MAX_BATCH_IMAGES: ClassVar[int] = int(os.getenv("MAX_BATCH_IMAGES", 10000))
+    # Largest uncompressed image accepted from an uploaded archive
+    MAX_ARCHIVE_MEMBER_MB: ClassVar[float] = float(
+        os.getenv("MAX_ARCHIVE_MEMBER_MB", 50)
+    )
+    INGEST_BATCH_IMAGES: ClassVar[int] = int(os.getenv("INGEST_BATCH_IMAGES", 256))
+    INGEST_WINDOW_MS: ClassVar[float] = float(os.getenv("INGEST_WINDOW_MS", 200))
+    INGEST_JOB_HISTORY: ClassVar[int] = int(os.getenv("INGEST_JOB_HISTORY", 1000))
+    MAX_BATCH_SIZE: ClassVar[int] = int(os.getenv("MAX_BATCH_SIZE", 16))
+    BATCH_WINDOW_MS: ClassVar[float] = float(os.getenv("BATCH_WINDOW_MS", 5))
+    EXECUTOR_TYPE: ClassVar[str] = os.getenv("EXECUTOR_TYPE", "thread")
+    EXECUTOR_WORKERS: ClassVar[int] = int(os.getenv("EXECUTOR_WORKERS", 2))
+    SEARCH_WORKERS: ClassVar[int] = int(os.getenv("SEARCH_WORKERS", 4))
+    PERSISTENCE_MODE: ClassVar[str] = os.getenv("PERSISTENCE_MODE", "full")
+    WAL_COMPACT_VECTORS: ClassVar[int] = int(os.getenv("WAL_COMPACT_VECTORS", 50000))
+    WAL_COMPACT_INTERVAL: ClassVar[float] = float(
+        os.getenv("WAL_COMPACT_INTERVAL", 300)
+    )
+    # Appends are scanned exactly until this many are merged into the index
+    DELTA_MAX_VECTORS: ClassVar[int] = int(os.getenv("DELTA_MAX_VECTORS", 4096))
+    INDEX_TYPE: ClassVar[str] = os.getenv("INDEX_TYPE", "auto")
+    IVF_THRESHOLD: ClassVar[int] = int(os.getenv("IVF_THRESHOLD", 20000))
+    NPROBE: ClassVar[int] = int(os.getenv("NPROBE", 16))
+    HNSW_M: ClassVar[int] = int(os.getenv("HNSW_M", 32))
+    HNSW_EF_SEARCH: ClassVar[int] = int(os.getenv("HNSW_EF_SEARCH", 64))
+    REBUILD_GROWTH: ClassVar[float] = float(os.getenv("REBUILD_GROWTH", 4))
+    INDEX_ENCODING: ClassVar[str] = os.getenv("INDEX_ENCODING", "flat")
+    PQ_M: ClassVar[int] = int(os.getenv("PQ_M", 16))
+    RERANK_FACTOR: ClassVar[int] = int(os.getenv("RERANK_FACTOR", 0))
+    MMAP_INDEX: ClassVar[bool] = os.getenv("MMAP_INDEX", "0") == "1"
@@ -0,0 +1,60 @@
+import tarfile
+import zipfile
+from typing import BinaryIO, Iterator, Tuple
+from src.utils.helpers import is_image_file
+from src.config.settings import Settings
+
+_CHUNK_SIZE = 1 << 20
+
+
+def iter_archive_images(
+    file: BinaryIO, max_member_mb: float = Settings.MAX_ARCHIVE_MEMBER_MB
+) -> Iterator[Tuple[str, bytes]]:
+    """Yield ``(member name, bytes)`` for each image in a zip or tar archive.
+
+    Members are read one at a time, so only one image is held in memory.
+    Raises ``ValueError`` if ``file`` is neither a zip nor a tar archive, or
+    if a member would decompress to more than ``max_member_mb``; the size in
+    the member's header is checked first and the bytes actually read are
+    counted too, since headers can lie.
+    """
+    limit = int(max_member_mb * 2**20)
+    if zipfile.is_zipfile(file):
+        file.seek(0)
+        with zipfile.ZipFile(file) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and is_image_file(info.filename):
+                    _check_size(info.filename, info.file_size, limit)
+                    with archive.open(info) as member:
+                        yield info.filename, _read_bounded(info.filename, member, limit)
+        return
+    file.seek(0)
+    try:
+        archive = tarfile.open(fileobj=file, mode="r:*")
+    except tarfile.TarError:
+        raise ValueError("Archive must be a zip or (compressed) tar file.")
+    with archive:
+        for member in archive:
+            if member.isfile() and is_image_file(member.name):
+                _check_size(member.name, member.size, limit)
+                stream = archive.extractfile(member)
+                yield member.name, _read_bounded(member.name, stream, limit)
+
+
+def _check_size(name: str, size: int, limit: int):
+    if size > limit:
+        raise ValueError(
+            f"Archive member '{name}' is {size} bytes uncompressed; the limit is {limit}."
+        )
+
+
+def _read_bounded(name: str, stream: BinaryIO, limit: int) -> bytes:
+    chunks = []
+    size = 0
+    while True:
+        chunk = stream.read(_CHUNK_SIZE)
+        if not chunk:
+            return b"".join(chunks)
+        size += len(chunk)
+        _check_size(name, size, limit)
+        chunks.append(chunk)
@@ -1,5 +1,5 @@
 import os
-from typing import List, Tuple
+from typing import Iterator, List, Tuple
 from src.utils.helpers import is_image_file
 from src.utils.logger import logger
 
@@ -16,29 +16,46 @@ class DataLoader:
         logger.info(f"Loaded classes: {self.classes}")
 
     def _get_classes(self) -> List[str]:
-        classes = [
-            d
-            for d in os.listdir(self.data_path)
-            if os.path.isdir(os.path.join(self.data_path, d))
-        ]
+        with os.scandir(self.data_path) as entries:
+            classes = sorted(entry.name for entry in entries if entry.is_dir())
         if not classes:
             logger.warning(f"No class directories found in {self.data_path}.")
         return classes
 
+    def refresh_classes(self) -> List[str]:
+        self.classes = self._get_classes()
+        return self.classes
+
+    def scan(self) -> Iterator[Tuple[str, str, os.stat_result]]:
+        """Yield ``(image_path, label, stat)`` for every image, streaming directory entries.
+
+        Class directories are re-listed on each scan so classes added since
+        construction are picked up.
+        """
+        for label in self.refresh_classes():
+            class_dir = os.path.join(self.data_path, label)
+            try:
+                entries = os.scandir(class_dir)
+            except OSError as e:
+                logger.warning(f"Cannot scan {class_dir}: {e}. Skipping.")
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.is_file() and is_image_file(entry.name):
+                        yield entry.path, label, entry.stat()
+                    else:
+                        logger.debug(f"Non-image file skipped: {entry.name}")
+
+    def iter_data(self) -> Iterator[Tuple[str, str]]:
+        """Yield ``(image_path, label)`` pairs one at a time."""
+        for image_path, label, _ in self.scan():
+            yield image_path, label
+
     def load_data(self) -> Tuple[List[str], List[str]]:
         image_paths = []
         labels = []
-        for label in self.classes:
-            class_dir = os.path.join(self.data_path, label)
-            if not os.path.isdir(class_dir):
-                logger.warning(f"{class_dir} is not a directory. Skipping.")
-                continue
-            for file in os.listdir(class_dir):
-                if is_image_file(file):
-                    image_path = os.path.join(class_dir, file)
-                    image_paths.append(image_path)
-                    labels.append(label)
-                else:
-                    logger.debug(f"Non-image file skipped: {file}")
+        for image_path, label in self.iter_data():
+            image_paths.append(image_path)
+            labels.append(label)
         logger.info(f"Loaded {len(image_paths)} images from {self.data_path}.")
         return image_paths, labels
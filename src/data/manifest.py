@@ -0,0 +1,111 @@
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+from src.utils.logger import logger
+from src.config.settings import Settings
+
+
+@dataclass
+class ManifestEntry:
+    path: str
+    label: str
+    size: int
+    mtime_ns: int
+    digest: Optional[str]
+    # Id of the file's vector in the feature database, -1 if it could not be decoded
+    vector_id: int
+
+
+class Manifest:
+    """SQLite record of the image files whose features are in the database.
+
+    Entries are keyed by path relative to the data directory and point at the
+    file's vector id in the database, so a sync can tell new, changed and
+    deleted files apart with a stat sweep instead of re-extracting everything.
+    """
+
+    def __init__(self, path: str = Settings.MANIFEST_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "path TEXT PRIMARY KEY, label TEXT NOT NULL, size INTEGER NOT NULL, "
+                "mtime_ns INTEGER NOT NULL, digest TEXT, vector_id INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS files_digest ON files (digest)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS files_vector_id ON files (vector_id)"
+            )
+        logger.info(f"Opened manifest {path} with {len(self)} files.")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def entries(self) -> Dict[str, ManifestEntry]:
+        return {entry.path: entry for entry in self._select("")}
+
+    def get(self, path: str) -> Optional[ManifestEntry]:
+        entries = self._select("WHERE path = ?", path)
+        return entries[0] if entries else None
+
+    def find_digest(self, digest: str) -> Optional[ManifestEntry]:
+        entries = self._select("WHERE digest = ? LIMIT 1", digest)
+        return entries[0] if entries else None
+
+    def paths_for(self, vector_ids: Iterable[int]) -> Dict[int, str]:
+        """Map vector ids to the paths of the files they were extracted from."""
+        vector_ids = list(vector_ids)
+        paths = {}
+        with self._lock:
+            # Stay under SQLite's limit on bound parameters
+            for start in range(0, len(vector_ids), 500):
+                batch = vector_ids[start : start + 500]
+                rows = self._conn.execute(
+                    "SELECT vector_id, path FROM files WHERE vector_id IN "
+                    f"({', '.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+                paths.update(rows)
+        return paths
+
+    def by_label(self, label: str) -> List[ManifestEntry]:
+        return self._select("WHERE label = ?", label)
+
+    def _select(self, clause: str, *params) -> List[ManifestEntry]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, label, size, mtime_ns, digest, vector_id FROM files "
+                + clause,
+                params,
+            ).fetchall()
+        return [ManifestEntry(*row) for row in rows]
+
+    def upsert(self, entries: Iterable[ManifestEntry]):
+        rows = [
+            (e.path, e.label, e.size, e.mtime_ns, e.digest, e.vector_id)
+            for e in entries
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+
+    def remove(self, paths: Iterable[str]):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM files WHERE path = ?", [(path,) for path in paths]
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
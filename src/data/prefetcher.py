@@ -0,0 +1,128 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue, Empty, Full
+from typing import Callable, Iterator, List, Tuple, Union
+import torch
+from src.utils.helpers import load_image
+from src.utils.logger import logger
+from src.utils.metrics import time_stage
+from src.config.settings import Settings
+
+_DONE = object()
+
+
+class ImagePrefetcher:
+    """Decode and preprocess images on worker threads ahead of the model.
+
+    Workers run ``load_image`` and the extractor transform, and ready batches
+    are handed to the consumer through a bounded queue so decoding overlaps
+    with inference without buffering the whole dataset in memory.
+    """
+
+    def __init__(
+        self,
+        transform: Callable,
+        num_workers: int = Settings.NUM_WORKERS,
+        prefetch_batches: int = Settings.PREFETCH_BATCHES,
+    ):
+        if num_workers <= 0:
+            raise ValueError(
+                f"Number of workers must be greater than 0, got {num_workers}"
+            )
+        if prefetch_batches <= 0:
+            raise ValueError(
+                f"Prefetch depth must be greater than 0, got {prefetch_batches}"
+            )
+        self.transform = transform
+        self.num_workers = num_workers
+        self.prefetch_batches = prefetch_batches
+
+    def batches(
+        self,
+        image_paths: List[str],
+        labels: List[str],
+        batch_size: int = Settings.BATCH_SIZE,
+    ) -> Iterator[Tuple[torch.Tensor, List[str], List[str]]]:
+        """Yield ``(batch, paths, labels)`` for every image that could be decoded."""
+        if batch_size <= 0:
+            raise ValueError(f"Batch size must be greater than 0, got {batch_size}")
+        queue: Queue = Queue(maxsize=self.prefetch_batches)
+        stop = threading.Event()
+        producer = threading.Thread(
+            target=self._produce,
+            args=(image_paths, labels, batch_size, queue, stop),
+            daemon=True,
+        )
+        producer.start()
+        try:
+            while True:
+                item = queue.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            # Unblock the producer if the consumer stopped early.
+            stop.set()
+            while producer.is_alive():
+                try:
+                    queue.get_nowait()
+                except Empty:
+                    producer.join(timeout=0.1)
+
+    def _produce(
+        self,
+        image_paths: List[str],
+        labels: List[str],
+        batch_size: int,
+        queue: Queue,
+        stop: threading.Event,
+    ):
+        try:
+            with ThreadPoolExecutor(max_workers=self.num_workers) as pool:
+                for start in range(0, len(image_paths), batch_size):
+                    if stop.is_set():
+                        return
+                    paths = image_paths[start : start + batch_size]
+                    tensors = list(pool.map(self._load, paths))
+                    batch = [
+                        (tensor, path, label)
+                        for tensor, path, label in zip(
+                            tensors, paths, labels[start : start + batch_size]
+                        )
+                        if tensor is not None
+                    ]
+                    if not batch:
+                        continue
+                    tensors, paths, batch_labels = zip(*batch)
+                    item = (torch.stack(tensors), list(paths), list(batch_labels))
+                    if not self._put(queue, item, stop):
+                        return
+        except Exception as e:
+            logger.error(f"Image prefetcher failed: {e}")
+            self._put(queue, e, stop)
+            return
+        self._put(queue, _DONE, stop)
+
+    def _load(self, image_path: str) -> Union[torch.Tensor, None]:
+        with time_stage("decode"):
+            image = load_image(image_path)
+        if image is None:
+            return None
+        try:
+            with time_stage("preprocess"):
+                return self.transform(image)
+        except Exception as e:
+            logger.error(f"Error preprocessing image {image_path}: {e}")
+            return None
+
+    @staticmethod
+    def _put(queue: Queue, item, stop: threading.Event) -> bool:
+        while not stop.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
@@ -1,87 +1,820 @@
 import faiss
 import numpy as np
 import os
-from typing import List, Tuple
+import struct
+import threading
+import zlib
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+from src.database.label_store import LabelStore
+from src.database.snapshot import IndexSnapshot
+from src.database.vector_store import VectorStore
 from src.utils.logger import logger
+from src.utils.metrics import time_stage
 from src.config.settings import Settings
 
+# start position, vector count, label bytes, crc32 of the payload
+_WAL_HEADER = struct.Struct("<QIII")
+# FAISS wants roughly this many training points per IVF centroid
+_MIN_POINTS_PER_CENTROID = 39
+_MAX_POINTS_PER_CENTROID = 256
+_MIN_TRAIN_SAMPLE = 10000
+# 8-bit product quantizer codebooks have 256 centroids per sub-vector
+_PQ_MIN_TRAIN = 256
+_SQ_TYPES = {
+    "sq8": faiss.ScalarQuantizer.QT_8bit,
+    "fp16": faiss.ScalarQuantizer.QT_fp16,
+}
+
 
 class FeatureDatabase:
+    """FAISS index, labels and raw vectors, persisted under ``database_path``.
+
+    Searches never block on writes. They run against the published
+    ``snapshot``; writers serialise on a lock and publish their changes as
+    the next generation with a single reference swap. Appends never touch
+    a published index: they collect in a small delta that searches scan
+    exactly, and are merged into a private copy of the index once the
+    delta reaches ``Settings.DELTA_MAX_VECTORS`` or the database is
+    compacted. Removals and rebuilds copy the index (once per
+    ``write_batch``).
+    """
+
     def __init__(
         self,
         feature_dim: int,
         database_path: str = Settings.DATABASE_PATH,
-        nlist: int = 100,
+        nlist: Optional[int] = None,
+        persistence_mode: str = Settings.PERSISTENCE_MODE,
+        index_type: str = Settings.INDEX_TYPE,
+        nprobe: int = Settings.NPROBE,
+        index_encoding: str = Settings.INDEX_ENCODING,
+        rerank_factor: int = Settings.RERANK_FACTOR,
+        mmap: bool = Settings.MMAP_INDEX,
     ):
+        if index_encoding not in ("flat", "sq8", "fp16", "pq"):
+            raise ValueError(
+                f"Index encoding must be one of flat, sq8, fp16 or pq, got {index_encoding}"
+            )
+        if index_encoding == "pq" and feature_dim % Settings.PQ_M != 0:
+            raise ValueError(
+                f"PQ_M ({Settings.PQ_M}) must divide the feature dimension {feature_dim}"
+            )
+        if index_type not in ("auto", "flat", "ivf", "hnsw"):
+            raise ValueError(
+                f"Index type must be one of auto, flat, ivf or hnsw, got {index_type}"
+            )
+        if persistence_mode not in ("full", "incremental"):
+            raise ValueError(
+                f"Persistence mode must be 'full' or 'incremental', got {persistence_mode}"
+            )
         self.feature_dim = feature_dim
         self.database_path = database_path
+        directory = os.path.dirname(database_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
         self.nlist = nlist
-        self.labels = []
-        self.labels_path = self.database_path + ".labels"
+        self.index_type = index_type
+        self.index_encoding = index_encoding
+        self.rerank_factor = rerank_factor
+        self.mmap = mmap
+        self._mmapped = False
+        self._nprobe = nprobe
+        self._trained_size = 0
+        self._snapshot_stale = False
+        self.persistence_mode = persistence_mode
+        self.label_store = LabelStore()
+        self.labels_path = self.database_path + ".labels.npy"
+        self.classes_path = self.database_path + ".classes.json"
+        self._legacy_labels_path = self.database_path + ".labels"
+        self.wal_path = self.database_path + ".wal"
+        self.vectors_path = self.database_path + ".vectors.f32"
+        # Present while a compaction moves its files into place
+        self.commit_path = self.database_path + ".commit"
+        self.raw_vectors: Optional[VectorStore] = None
+        # Vectors appended while the index was shared, with ids from _delta_start
+        self._delta = VectorStore(feature_dim)
+        self._delta_start = 0
+        self._pending: List[Tuple[np.ndarray, List[str]]] = []
+        self._wal_vectors = 0
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        # Whether self.index is shared with readers and must be copied first
+        self._index_published = False
+        self._snapshot: Optional[IndexSnapshot] = None
+        self._compaction_stop = threading.Event()
+        self._compaction_thread = None
 
+        self._recover_compaction()
         if os.path.exists(self.database_path):
             try:
-                self.index = faiss.read_index(self.database_path)
+                self.index = self._read_index()
+                self._trained_size = self._loaded_training_size()
+                self._configure_index(self.index)
                 logger.info("Loaded existing FAISS index.")
             except Exception as e:
                 logger.error(
                     f"Failed to load FAISS index from {self.database_path}: {e}"
                 )
-                self.index = self._create_index()
+                self.index = self._create_index("flat")
         else:
-            self.index = self._create_index()
+            self.index = self._create_index("flat")
             logger.info("Initialized new FAISS index.")
+        if self.index.d != feature_dim:
+            raise ValueError(
+                f"Index at {self.database_path} holds {self.index.d}-d vectors but the "
+                f"model produces {feature_dim}-d ones; was it built by another model?"
+            )
 
-        if os.path.exists(self.labels_path):
+        if os.path.exists(self.labels_path) and os.path.exists(self.classes_path):
             try:
-                with open(self.labels_path, "r") as f:
-                    self.labels = [line.strip() for line in f]
-                logger.info(
-                    f"Loaded {len(self.labels)} labels from {self.labels_path}."
+                self.label_store = LabelStore.load(
+                    self.labels_path, self.classes_path, mmap=self.mmap
                 )
             except Exception as e:
                 logger.error(f"Failed to load labels from {self.labels_path}: {e}")
+        elif os.path.exists(self._legacy_labels_path):
+            try:
+                self.label_store = LabelStore.load_text(self._legacy_labels_path)
+                # Rewrite in the binary format on the next save
+                self._snapshot_stale = True
+            except Exception as e:
+                logger.error(
+                    f"Failed to load labels from {self._legacy_labels_path}: {e}"
+                )
+
+        # Compressed codes only reconstruct approximately; retraining from them
+        # would compound the quantization error on every rebuild
+        lossy = self.index_encoding != "flat" or self.encoding != "flat"
+        if self.rerank_factor > 0 or lossy:
+            self.raw_vectors = self._load_raw_vectors()
+
+        if not self._has_ids(self.index):
+            self._assign_ids()
+        if os.path.exists(self.wal_path):
+            self._replay_wal()
+        self._maybe_rebuild()
+        self._publish()
+
+    def _read_index(self):
+        if self.mmap:
+            # Newer FAISS maps any index with IO_FLAG_MMAP_IFC; older builds
+            # can only map IVF inverted lists
+            flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+            try:
+                index = faiss.read_index(self.database_path, flags)
+                self._mmapped = True
+                logger.info(f"Memory-mapped FAISS index from {self.database_path}.")
+                return index
+            except Exception as e:
+                logger.warning(f"Failed to memory-map {self.database_path}: {e}")
+        self._mmapped = False
+        return faiss.read_index(self.database_path)
+
+    def _ensure_writable(self):
+        if self._mmapped:
+            # Mapped pages are shared read-only; take a private copy before mutating
+            self.index = faiss.read_index(self.database_path)
+            logger.info("Loaded private copy of memory-mapped index for writing.")
+        elif self._index_published:
+            # Readers may be searching the published index right now
+            self.index = faiss.clone_index(self.index)
+        else:
+            return
+        self._configure_index(self.index)
+        self._mmapped = False
+        self._index_published = False
+
+    @property
+    def snapshot(self) -> IndexSnapshot:
+        """The latest published generation; take it once per read."""
+        return self._snapshot
+
+    @contextmanager
+    def write_batch(self) -> Iterator["FeatureDatabase"]:
+        """Group writes into one generation, so the index is copied only once.
+
+        Searches keep seeing the previous generation until the outermost
+        batch ends. Every public write method runs in a batch of its own.
+        """
+        with self._lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self._publish()
+
+    def _publish(self):
+        class_ids, names = self.label_store.freeze()
+        raw_vectors = None
+        if self.raw_vectors is not None:
+            raw_vectors = self.raw_vectors.array.view()
+            raw_vectors.flags.writeable = False
+        # Appends only write past the current size, so the view stays valid
+        delta = self._delta.array.view()
+        delta.flags.writeable = False
+        previous = self._snapshot
+        self._snapshot = IndexSnapshot(
+            generation=previous.generation + 1 if previous is not None else 0,
+            index=self.index,
+            class_ids=class_ids,
+            names=names,
+            raw_vectors=raw_vectors,
+            rerank_factor=self.rerank_factor,
+            delta=delta,
+            delta_start=self._delta_start,
+        )
+        self._index_published = True
+
+    @staticmethod
+    def _has_ids(index) -> bool:
+        # IVF indexes store ids natively; everything else is wrapped in an ID map
+        index = faiss.downcast_index(index)
+        return isinstance(index, (faiss.IndexIDMap2, faiss.IndexIVF))
+
+    def _assign_ids(self):
+        """Move a positional index from an older release onto stable ids."""
+        n = self.index.ntotal
+        features = self.index.reconstruct_n(0, n)
+        self._rebuild_from(
+            features, np.arange(n, dtype=np.int64), self.kind, self.encoding
+        )
+        logger.info(f"Assigned stable ids to the {n} vectors of the loaded index.")
+
+    def _base_index(self):
+        index = faiss.downcast_index(self.index)
+        if isinstance(index, faiss.IndexIDMap2):
+            index = faiss.downcast_index(index.index)
+        return index
+
+    @property
+    def ntotal(self) -> int:
+        """Vectors in the index, including appends not merged into it yet."""
+        return self.index.ntotal + len(self._delta)
+
+    @property
+    def ids(self) -> np.ndarray:
+        """Ids of the vectors currently in the index."""
+        return self.label_store.live_ids()
+
+    @property
+    def labels(self) -> List[str]:
+        """Labels by vector id ("Unknown" for removed ids); prefer ``labels_for``."""
+        return self.label_store.to_list()
+
+    def labels_for(self, indices: np.ndarray) -> np.ndarray:
+        """Class names for an array of vector ids, as of the current snapshot."""
+        return self._snapshot.names_for(indices)
+
+    def class_ids_for(self, indices: np.ndarray) -> np.ndarray:
+        """Class ids for an array of vector ids, as of the current snapshot."""
+        return self._snapshot.class_ids_for(indices)
+
+    def memory_bytes(self) -> int:
+        """Approximate bytes held in memory by the published index and labels.
+
+        The raw vector store is mapped from disk and only paged in to re-rank
+        or rebuild, so it is not counted.
+        """
+        snapshot = self._snapshot
+        size = snapshot.class_ids.nbytes + self._index_bytes(snapshot.index)
+        return size + snapshot.delta.nbytes
 
-    def _create_index(self):
-        quantizer = faiss.IndexFlatL2(self.feature_dim)
-        index = faiss.IndexIVFFlat(quantizer, self.feature_dim, self.nlist)
-        index.train(np.zeros((self.nlist, self.feature_dim), dtype=np.float32))
+    @staticmethod
+    def _index_bytes(index) -> int:
+        index = faiss.downcast_index(index)
+        n = index.ntotal
+        size = 0
+        if isinstance(index, faiss.IndexIDMap2):
+            # Id array plus the reverse hash map
+            size += n * 24
+            index = faiss.downcast_index(index.index)
+        if isinstance(index, faiss.IndexHNSW):
+            # Level-0 links dominate the graph
+            size += n * index.hnsw.nb_neighbors(0) * 4
+            index = faiss.downcast_index(index.storage)
+        if isinstance(index, faiss.IndexIVF):
+            size += n * 8 + index.nlist * index.d * 4
+        return size + n * getattr(index, "code_size", index.d * 4)
+
+    @property
+    def nprobe(self) -> int:
+        return self._nprobe
+
+    @nprobe.setter
+    def nprobe(self, value: int):
+        if value <= 0:
+            raise ValueError(f"nprobe must be greater than 0, got {value}")
+        self._nprobe = value
+        self._configure_index(self.index)
+
+    @property
+    def kind(self) -> str:
+        index = self._base_index()
+        if isinstance(index, faiss.IndexIVF):
+            return "ivf"
+        if isinstance(index, faiss.IndexHNSW):
+            return "hnsw"
+        return "flat"
+
+    @property
+    def encoding(self) -> str:
+        index = self._base_index()
+        if isinstance(index, faiss.IndexHNSW):
+            index = faiss.downcast_index(index.storage)
+        if isinstance(index, (faiss.IndexPQ, faiss.IndexIVFPQ)):
+            return "pq"
+        if isinstance(
+            index, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)
+        ):
+            return "fp16" if index.sq.qtype == _SQ_TYPES["fp16"] else "sq8"
+        return "flat"
+
+    def _desired_encoding(self, n: int) -> str:
+        # Keep exact vectors until there is enough data to train the codebooks
+        if self.index_encoding == "pq" and n < _PQ_MIN_TRAIN:
+            return "flat"
+        if self.index_encoding == "sq8" and n == 0:
+            return "flat"
+        return self.index_encoding
+
+    @staticmethod
+    def _needs_training(kind: str, encoding: str) -> bool:
+        return kind == "ivf" or encoding in ("sq8", "pq")
+
+    def _desired_kind(self, n: int) -> str:
+        if self.index_type == "auto":
+            kind = "ivf" if n >= Settings.IVF_THRESHOLD else "flat"
+        else:
+            kind = self.index_type
+        # An IVF index trained on a handful of points is worse than a flat scan
+        if kind == "ivf" and n < _MIN_POINTS_PER_CENTROID * 4:
+            kind = "flat"
+        return kind
+
+    def _create_index(
+        self,
+        kind: str,
+        encoding: str = "flat",
+        train_features: Optional[np.ndarray] = None,
+    ):
+        d = self.feature_dim
+        nlist = 1
+        if kind == "ivf":
+            n = len(train_features)
+            nlist = self.nlist or int(4 * np.sqrt(n))
+            nlist = max(1, min(nlist, n // _MIN_POINTS_PER_CENTROID))
+            quantizer = faiss.IndexFlatL2(d)
+            if encoding == "pq":
+                index = faiss.IndexIVFPQ(quantizer, d, nlist, Settings.PQ_M, 8)
+            elif encoding in _SQ_TYPES:
+                index = faiss.IndexIVFScalarQuantizer(
+                    quantizer, d, nlist, _SQ_TYPES[encoding]
+                )
+            else:
+                index = faiss.IndexIVFFlat(quantizer, d, nlist)
+        elif kind == "hnsw":
+            if encoding == "pq":
+                index = faiss.IndexHNSWPQ(d, Settings.PQ_M, Settings.HNSW_M)
+            elif encoding in _SQ_TYPES:
+                index = faiss.IndexHNSWSQ(d, _SQ_TYPES[encoding], Settings.HNSW_M)
+            else:
+                index = faiss.IndexHNSWFlat(d, Settings.HNSW_M)
+        else:
+            if encoding == "pq":
+                index = faiss.IndexPQ(d, Settings.PQ_M, 8)
+            elif encoding in _SQ_TYPES:
+                index = faiss.IndexScalarQuantizer(d, _SQ_TYPES[encoding])
+            else:
+                index = faiss.IndexFlatL2(d)
+        if kind != "ivf":
+            index = faiss.IndexIDMap2(index)
+        if not index.is_trained:
+            n = len(train_features)
+            sample_size = min(
+                n, max(nlist * _MAX_POINTS_PER_CENTROID, _MIN_TRAIN_SAMPLE)
+            )
+            sample = np.random.default_rng(0).choice(n, sample_size, replace=False)
+            index.train(train_features[np.sort(sample)])
+            logger.info(
+                f"Trained {kind} {encoding} index with {nlist} lists on {sample_size} vectors."
+            )
+        self._configure_index(index)
         return index
 
-    def add_features(self, features: np.ndarray, labels: List[str]):
+    def _configure_index(self, index):
+        index = faiss.downcast_index(index)
+        if isinstance(index, faiss.IndexIDMap2):
+            index = faiss.downcast_index(index.index)
+        if isinstance(index, faiss.IndexIVF):
+            index.nprobe = min(self._nprobe, index.nlist)
+            # Lets vectors be reconstructed and removed by id
+            if index.direct_map.type != faiss.DirectMap.Hashtable:
+                index.set_direct_map_type(faiss.DirectMap.Hashtable)
+        elif isinstance(index, faiss.IndexHNSW):
+            index.hnsw.efSearch = Settings.HNSW_EF_SEARCH
+
+    def _loaded_training_size(self) -> int:
+        index = self._base_index()
+        if isinstance(index, faiss.IndexIVF):
+            centroids = index.quantizer.reconstruct_n(0, index.nlist)
+            if np.ptp(centroids, axis=0).max() == 0:
+                # Quantizer was trained on placeholder data; retrain on real vectors
+                logger.warning("Loaded IVF index has degenerate centroids.")
+                return 0
+        return self.index.ntotal
+
+    def _live_vectors(self) -> Tuple[np.ndarray, np.ndarray]:
+        """The vectors still in the index and their ids."""
+        ids = self.label_store.live_ids()
+        if self.raw_vectors is not None:
+            return self.raw_vectors.take(ids), ids
+        features = np.empty((len(ids), self.feature_dim), dtype=np.float32)
+        in_delta = ids >= self._delta_start if len(self._delta) else ids < 0
+        features[in_delta] = self._delta.take(ids[in_delta] - self._delta_start)
+        if not in_delta.all():
+            features[~in_delta] = self.index.reconstruct_batch(ids[~in_delta])
+        return features, ids
+
+    def _maybe_rebuild(self):
+        with self._lock:
+            n = self.ntotal
+            kind = self._desired_kind(n)
+            encoding = self._desired_encoding(n)
+            outgrown = (
+                self._needs_training(kind, encoding)
+                and n > self._trained_size * Settings.REBUILD_GROWTH
+            )
+            if kind == self.kind and encoding == self.encoding and not outgrown:
+                return
+            self.rebuild(kind, encoding)
+
+    def rebuild(self, kind: Optional[str] = None, encoding: Optional[str] = None):
+        """Rebuild the index from its own vectors, retraining it when needed."""
+        with self.write_batch():
+            self._rebuild_from(*self._live_vectors(), kind, encoding)
+
+    def _rebuild_from(
+        self,
+        features: np.ndarray,
+        ids: np.ndarray,
+        kind: Optional[str] = None,
+        encoding: Optional[str] = None,
+    ):
+        with self._lock:
+            n = len(features)
+            kind = kind or self._desired_kind(n)
+            encoding = encoding or self._desired_encoding(n)
+            previous = f"{self.kind} {self.encoding}"
+            self.index = self._create_index(kind, encoding, features)
+            self._mmapped = False
+            self._index_published = False
+            self._delta = VectorStore(self.feature_dim)
+            if n:
+                self.index.add_with_ids(features, ids)
+            self._trained_size = n
+            self._snapshot_stale = True
+            logger.info(
+                f"Rebuilt {previous} index as {kind} {encoding} with {n} vectors."
+            )
+
+    def _load_raw_vectors(self) -> VectorStore:
+        store = VectorStore(self.feature_dim, path=self.vectors_path)
+        n = len(self.label_store)
+        if len(store) >= n:
+            # Rows past the saved labels were appended after the last
+            # compaction; the write-ahead log replays the ones that count
+            store.truncate(n)
+            logger.info(f"Mapped {n} raw vectors from {self.vectors_path}.")
+            return store
+        logger.warning(
+            f"Raw vector store holds {len(store)} vectors but {n} ids are assigned."
+        )
+        # Fall back to whatever the index can reconstruct (lossy for compressed codes)
+        if self.index.ntotal:
+            logger.warning("Rebuilding raw vector store from the index.")
+        features, ids = self._live_vectors()
+        # Rows are addressed by id; removed ids keep a zero row
+        rows = np.zeros((n, self.feature_dim), dtype=np.float32)
+        rows[ids] = features
+        store.truncate(0)
+        store.append(rows)
+        return store
+
+    def _append(self, features: np.ndarray, labels: List[str]) -> np.ndarray:
+        # Ids are never reused, so the label store's length is the next free id
+        start = len(self.label_store)
+        ids = np.arange(start, start + len(features), dtype=np.int64)
+        if self._index_published or self._mmapped:
+            # Readers share the index; set the vectors aside instead of copying it
+            if not len(self._delta):
+                self._delta_start = start
+            self._delta.append(features)
+        else:
+            self._merge_delta()
+            self.index.add_with_ids(features, ids)
+        self.label_store.append(labels)
+        if self.raw_vectors is not None:
+            self.raw_vectors.append(features)
+        if len(self._delta) >= Settings.DELTA_MAX_VECTORS:
+            self._merge_delta()
+        return ids
+
+    def _merge_delta(self):
+        """Fold the set-aside appends into a private copy of the index."""
+        n = len(self._delta)
+        if not n:
+            return
+        self._ensure_writable()
+        self.index.add_with_ids(
+            self._delta.array,
+            np.arange(self._delta_start, self._delta_start + n, dtype=np.int64),
+        )
+        # Published snapshots keep the old buffer alive
+        self._delta = VectorStore(self.feature_dim)
+        logger.debug("Merged {} appended features into the index.", n)
+
+    def add_features(self, features: np.ndarray, labels: List[str]) -> np.ndarray:
+        """Add vectors with their labels and return the ids assigned to them."""
         if features.ndim == 1:
             features = features.reshape(1, -1)
         if features.shape[1] != self.feature_dim:
             logger.error(
                 f"Feature dimension mismatch: expected {self.feature_dim}, got {features.shape[1]}"
             )
-            return
-        self.index.add(features)
-        self.labels.extend(labels)
+            return np.empty(0, dtype=np.int64)
+        features = np.ascontiguousarray(features, dtype=np.float32)
+        with self.write_batch():
+            ids = self._append(features, labels)
+            if self.persistence_mode == "incremental":
+                self._pending.append((features, list(labels)))
+            self._maybe_rebuild()
         logger.info(f"Added {features.shape[0]} features to the database.")
+        return ids
+
+    def remove_ids(self, ids: np.ndarray) -> int:
+        """Remove the vectors with the given ids and return how many were removed.
+
+        Other vectors keep their ids. Removal is only persisted by the next
+        ``save_database``.
+        """
+        with self.write_batch():
+            ids = np.unique(np.asarray(ids, dtype=np.int64))
+            ids = ids[self.label_store.class_ids_for(ids) >= 0]
+            if not len(ids):
+                return 0
+            if self.kind == "hnsw":
+                # HNSW graphs cannot drop nodes; rebuild from the survivors
+                features, live = self._live_vectors()
+                keep = ~np.isin(live, ids)
+                self._rebuild_from(features[keep], live[keep], "hnsw", self.encoding)
+            else:
+                self._merge_delta()
+                self._ensure_writable()
+                self.index.remove_ids(ids)
+            self.label_store.discard(ids)
+            self._snapshot_stale = True
+            self._maybe_rebuild()
+        logger.info(f"Removed {len(ids)} features from the database.")
+        return len(ids)
+
+    def remove_class(self, label: str) -> int:
+        """Remove every vector labelled ``label``."""
+        with self.write_batch():
+            return self.remove_ids(self.label_store.ids_of(label))
+
+    def relabel(self, ids: np.ndarray, label: str) -> int:
+        """Move the given vectors to class ``label`` and return how many moved."""
+        with self.write_batch():
+            ids = np.unique(np.asarray(ids, dtype=np.int64))
+            ids = ids[self.label_store.class_ids_for(ids) >= 0]
+            if len(ids):
+                self.label_store.assign(ids, label)
+                self._snapshot_stale = True
+        logger.info(f"Relabelled {len(ids)} features as '{label}'.")
+        return len(ids)
+
+    def relabel_class(self, old_label: str, new_label: str) -> int:
+        """Rename class ``old_label`` to ``new_label``, merging if it exists."""
+        with self.write_batch():
+            return self.relabel(self.label_store.ids_of(old_label), new_label)
 
     def save_database(self):
-        try:
-            faiss.write_index(self.index, self.database_path)
-            with open(self.labels_path, "w") as f:
-                for label in self.labels:
-                    f.write(f"{label}\n")
+        with time_stage("persistence"):
+            if self.persistence_mode == "incremental":
+                self._flush_wal()
+                if (
+                    self._snapshot_stale
+                    or self._wal_vectors >= Settings.WAL_COMPACT_VECTORS
+                ):
+                    self.compact()
+            else:
+                self.compact()
+
+    def compact(self):
+        """Write the full index and labels, then drop the write-ahead log.
+
+        Every file is written to a temporary path and synced first; the
+        commit marker created after that is the commit point. A crash before
+        it leaves the previous files and the log intact, and a crash after
+        it is rolled forward by ``_recover_compaction`` on the next start,
+        so the index and labels on disk always come from the same compaction.
+
+        Raises if any file cannot be written, so callers do not record the
+        change anywhere else (e.g. in the manifest) as if it were persisted.
+        """
+        with self.write_batch():
+            self._merge_delta()
+            faiss.write_index(self.index, self.database_path + ".tmp")
+            self.label_store.save(self.labels_path + ".tmp", self.classes_path + ".tmp")
+            if self.raw_vectors is not None:
+                # Append-only, so syncing it is enough to cover the new labels
+                self.raw_vectors.flush()
+            for path in self._compaction_files():
+                if os.path.exists(path + ".tmp"):
+                    self._fsync(path + ".tmp")
+            with open(self.commit_path, "wb") as f:
+                os.fsync(f.fileno())
+            self._replace_compacted()
+            if os.path.exists(self._legacy_labels_path):
+                os.remove(self._legacy_labels_path)
+            # Records already in the snapshot are skipped on replay, so a
+            # crash before this point only costs a longer replay.
+            if os.path.exists(self.wal_path):
+                os.remove(self.wal_path)
+            if self.mmap and not self._mmapped:
+                # Share the freshly written pages again instead of a private copy
+                self.index = self._read_index()
+                self._configure_index(self.index)
+            self._pending.clear()
+            self._wal_vectors = 0
+            self._snapshot_stale = False
             logger.info(
                 f"Saved feature database to {self.database_path} and labels to {self.labels_path}."
             )
-        except Exception as e:
-            logger.error(f"Failed to save database: {e}")
+
+    def _compaction_files(self) -> List[str]:
+        # Labels ahead of the index; order only matters without the marker
+        return [
+            self.classes_path,
+            self.labels_path,
+            self.database_path,
+        ]
+
+    def _replace_compacted(self):
+        for path in self._compaction_files():
+            if os.path.exists(path + ".tmp"):
+                os.replace(path + ".tmp", path)
+        os.remove(self.commit_path)
+
+    def _recover_compaction(self):
+        """Finish a committed compaction or discard an uncommitted one."""
+        if os.path.exists(self.commit_path):
+            self._replace_compacted()
+            logger.warning(
+                f"Finished moving the files of an interrupted compaction of {self.database_path}."
+            )
+            return
+        for path in self._compaction_files():
+            if os.path.exists(path + ".tmp"):
+                os.remove(path + ".tmp")
+
+    @staticmethod
+    def _fsync(path: str):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def start_compaction(self, interval: float = Settings.WAL_COMPACT_INTERVAL):
+        """Periodically fold the write-ahead log into the index file."""
+        if self.persistence_mode != "incremental" or interval <= 0:
+            return
+        if self._compaction_thread is not None:
+            return
+        self._compaction_stop.clear()
+        self._compaction_thread = threading.Thread(
+            target=self._compaction_loop, args=(interval,), daemon=True
+        )
+        self._compaction_thread.start()
+        logger.info(f"Started background compaction every {interval} seconds.")
+
+    def stop_compaction(self):
+        if self._compaction_thread is None:
+            return
+        self._compaction_stop.set()
+        self._compaction_thread.join()
+        self._compaction_thread = None
+
+    def _compaction_loop(self, interval: float):
+        while not self._compaction_stop.wait(interval):
+            if self._wal_vectors > 0:
+                try:
+                    self.compact()
+                except Exception as e:
+                    logger.error(f"Background compaction failed: {e}")
+
+    def _flush_wal(self):
+        with self._lock:
+            if not self._pending:
+                return
+            count = sum(len(f) for f, _ in self._pending)
+            start = len(self.label_store) - count
+            with open(self.wal_path, "ab") as f:
+                end = f.tell()
+                try:
+                    for features, labels in self._pending:
+                        label_bytes = "\n".join(labels).encode("utf-8")
+                        payload = label_bytes + features.tobytes()
+                        f.write(
+                            _WAL_HEADER.pack(
+                                start,
+                                len(features),
+                                len(label_bytes),
+                                zlib.crc32(payload),
+                            )
+                        )
+                        f.write(payload)
+                        start += len(features)
+                    f.flush()
+                    os.fsync(f.fileno())
+                except Exception:
+                    # Drop the partial records so the next flush can rewrite them
+                    f.truncate(end)
+                    raise
+            self._wal_vectors += count
+            logger.info(f"Appended {count} features to {self.wal_path}.")
+            self._pending.clear()
+
+    def _replay_wal(self):
+        replayed = 0
+        valid_end = 0
+        corrupt = False
+        with open(self.wal_path, "rb") as f:
+            while True:
+                header = f.read(_WAL_HEADER.size)
+                if not header:
+                    break
+                if len(header) < _WAL_HEADER.size:
+                    logger.warning("Truncated write-ahead log header, stopping replay.")
+                    corrupt = True
+                    break
+                start, count, label_len, crc = _WAL_HEADER.unpack(header)
+                payload = f.read(label_len + count * self.feature_dim * 4)
+                if (
+                    len(payload) != label_len + count * self.feature_dim * 4
+                    or zlib.crc32(payload) != crc
+                ):
+                    logger.warning("Corrupt write-ahead log record, stopping replay.")
+                    corrupt = True
+                    break
+                next_id = len(self.label_store)
+                if start > next_id:
+                    logger.error(
+                        f"Write-ahead log starts at id {start} but the next free id is {next_id}."
+                    )
+                    break
+                valid_end = f.tell()
+                self._wal_vectors += count
+                if start + count <= next_id:
+                    # Already folded into the index snapshot
+                    continue
+                labels = payload[:label_len].decode("utf-8").split("\n")
+                features = np.frombuffer(payload[label_len:], dtype=np.float32)
+                features = features.reshape(count, self.feature_dim)
+                skip = next_id - start
+                self._append(np.ascontiguousarray(features[skip:]), labels[skip:])
+                replayed += count - skip
+        if corrupt:
+            # Drop the torn tail so later appends stay readable
+            with open(self.wal_path, "r+b") as f:
+                f.truncate(valid_end)
+        logger.info(f"Replayed {replayed} features from {self.wal_path}.")
 
     def search(
-        self, query_features: np.ndarray, k: int = Settings.K_NEIGHBORS
+        self,
+        query_features: np.ndarray,
+        k: int = Settings.K_NEIGHBORS,
+        snapshot: Optional[IndexSnapshot] = None,
     ) -> Tuple[np.ndarray, np.ndarray]:
+        """Nearest neighbours in ``snapshot``, by default the current one.
+
+        Safe to call from any number of threads while writes are in progress.
+        """
         if query_features.shape[1] != self.feature_dim:
             logger.error(
                 f"Query feature dimension mismatch: expected {self.feature_dim}, got {query_features.shape[1]}"
             )
             return np.array([]), np.array([])
-        distances, indices = self.index.search(query_features, k)
+        snapshot = snapshot or self._snapshot
+        with time_stage("search"):
+            distances, indices = snapshot.search(query_features, k)
         logger.debug(
-            f"Performed search for {query_features.shape[0]} queries with top {k} neighbors."
+            "Performed search for {} queries with top {} neighbors.",
+            query_features.shape[0],
+            k,
         )
         return distances, indices
@@ -0,0 +1,165 @@
+import json
+from typing import Dict, List, Tuple
+import numpy as np
+from src.utils.logger import logger
+
+UNKNOWN_LABEL = "Unknown"
+
+
+class LabelStore:
+    """Integer class ids indexed by vector id plus a small id -> class name table.
+
+    Lookups for a whole ``(batch, k)`` matrix of vector ids are a single
+    gather; ids that are out of range (including FAISS' -1 padding) or that
+    were removed map to class id -1 and the name ``"Unknown"``. Arrays
+    handed out by ``freeze`` are copied before any in-place change, so they
+    stay valid for readers of an older snapshot.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.class_names: List[str] = []
+        self._class_ids: Dict[str, int] = {}
+        self._ids = np.empty(capacity, dtype=np.int32)
+        self._size = 0
+        self._names = np.array([UNKNOWN_LABEL], dtype=object)
+        self._frozen = False
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._ids[: self._size]
+
+    @property
+    def num_classes(self) -> int:
+        return len(self.class_names)
+
+    def class_id(self, label: str) -> int:
+        return self._class_ids.get(label, -1)
+
+    def live_ids(self) -> np.ndarray:
+        return np.flatnonzero(self.ids >= 0)
+
+    def ids_of(self, label: str) -> np.ndarray:
+        class_id = self.class_id(label)
+        if class_id < 0:
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(self.ids == class_id)
+
+    def discard(self, ids: np.ndarray):
+        """Mark ``ids`` as removed; they resolve to class id -1 from now on."""
+        self._make_writable()
+        self._ids[ids] = -1
+        self._drop_empty_classes()
+
+    def assign(self, ids: np.ndarray, label: str):
+        class_id = self._intern(label)
+        self._make_writable()
+        self._ids[ids] = class_id
+        self._drop_empty_classes()
+
+    def append(self, labels: List[str]):
+        new_ids = np.fromiter(
+            (self._intern(label) for label in labels), dtype=np.int32, count=len(labels)
+        )
+        end = self._size + len(new_ids)
+        if end > len(self._ids):
+            # Grow geometrically so repeated small appends stay amortised O(1)
+            grown = np.empty(max(end, 2 * len(self._ids)), dtype=np.int32)
+            grown[: self._size] = self._ids[: self._size]
+            self._ids = grown
+        self._ids[self._size : end] = new_ids
+        self._size = end
+
+    def class_ids_for(self, indices: np.ndarray) -> np.ndarray:
+        indices = np.asarray(indices)
+        if self._size == 0:
+            return np.full(indices.shape, -1, dtype=np.int32)
+        valid = (indices >= 0) & (indices < self._size)
+        return np.where(valid, self.ids[np.where(valid, indices, 0)], -1)
+
+    def names_for(self, indices: np.ndarray) -> np.ndarray:
+        # The trailing "Unknown" entry makes class id -1 resolve to it
+        return self._names[self.class_ids_for(indices)]
+
+    def freeze(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Read-only class ids by vector id and class names as they are now."""
+        # Appends only write past the current size, so only discard and
+        # assign need to copy before touching a frozen buffer
+        self._frozen = True
+        ids = self.ids.view()
+        ids.flags.writeable = False
+        return ids, self._names
+
+    def to_list(self) -> List[str]:
+        return self._names[self.ids].tolist()
+
+    def save(self, ids_path: str, classes_path: str):
+        with open(ids_path, "wb") as f:
+            np.save(f, self.ids)
+        with open(classes_path, "w") as f:
+            json.dump(self.class_names, f)
+
+    @classmethod
+    def load(cls, ids_path: str, classes_path: str, mmap: bool = False) -> "LabelStore":
+        store = cls(capacity=0)
+        with open(classes_path, "r") as f:
+            for name in json.load(f):
+                store._intern(name)
+        ids = np.load(ids_path, mmap_mode="r" if mmap else None)
+        if ids.ndim != 1:
+            raise ValueError(f"Label ids must be 1-D, got shape {ids.shape}")
+        # Full, so the first append grows into a fresh private buffer
+        store._ids = ids
+        store._size = len(ids)
+        # Older saves kept classes whose vectors were all removed or renamed
+        store._drop_empty_classes()
+        logger.info(
+            f"Loaded {len(store)} labels over {store.num_classes} classes from {ids_path}."
+        )
+        return store
+
+    @classmethod
+    def load_text(cls, path: str) -> "LabelStore":
+        """Read the legacy one-label-per-line format."""
+        store = cls()
+        with open(path, "r") as f:
+            store.append([line.strip() for line in f])
+        logger.info(f"Loaded {len(store)} labels from legacy file {path}.")
+        return store
+
+    def _make_writable(self):
+        # Memory-mapped ids are read-only and frozen ones may be in use by a
+        # reader; copy them into private memory
+        if self._frozen or not self._ids.flags.writeable:
+            self._ids = np.array(self._ids)
+            self._frozen = False
+
+    def _drop_empty_classes(self):
+        """Forget classes no vector belongs to any more, renumbering the rest."""
+        if not self.class_names:
+            return
+        live = self.ids[self.ids >= 0]
+        keep = np.bincount(live, minlength=self.num_classes) > 0
+        if keep.all():
+            return
+        # The extra trailing slot maps class id -1 to itself
+        remap = np.full(self.num_classes + 1, -1, dtype=np.int32)
+        remap[:-1][keep] = np.arange(keep.sum(), dtype=np.int32)
+        self._make_writable()
+        self._ids[: self._size] = remap[self.ids]
+        dropped = [name for name, k in zip(self.class_names, keep) if not k]
+        self.class_names = [name for name, k in zip(self.class_names, keep) if k]
+        self._class_ids = {name: i for i, name in enumerate(self.class_names)}
+        self._names = np.array(self.class_names + [UNKNOWN_LABEL], dtype=object)
+        logger.info(f"Dropped emptied classes {dropped}.")
+
+    def _intern(self, label: str) -> int:
+        class_id = self._class_ids.get(label)
+        if class_id is None:
+            class_id = len(self.class_names)
+            self.class_names.append(label)
+            self._class_ids[label] = class_id
+            self._names = np.array(self.class_names + [UNKNOWN_LABEL], dtype=object)
+        return class_id
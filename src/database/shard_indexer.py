@@ -0,0 +1,250 @@
+import glob
+import json
+import os
+import zlib
+from typing import List, Optional, Set, Tuple
+import numpy as np
+from src.data.data_loader import DataLoader
+from src.data.manifest import Manifest, ManifestEntry
+from src.database.feature_database import FeatureDatabase
+from src.utils.helpers import chunked
+from src.utils.logger import logger
+from src.config.settings import Settings
+
+
+class ShardIndexer:
+    """Extract features for a dataset into resumable on-disk shards.
+
+    Images are assigned to one of ``num_shards`` shards by a stable hash of
+    their path relative to the data root, so N processes can each index one
+    shard in parallel. Every ``chunk_size`` images are written as one ``.npz``
+    chunk (features, labels, relative paths) with an atomic rename, so a
+    crashed run loses at most the chunk in flight; on restart, images already
+    recorded in a chunk are skipped. ``merge`` loads the finished shards into
+    a single ``FeatureDatabase``.
+    """
+
+    def __init__(
+        self,
+        output_dir: str = Settings.SHARD_PATH,
+        shard_id: int = 0,
+        num_shards: int = 1,
+        chunk_size: int = Settings.INDEX_CHUNK_SIZE,
+    ):
+        if num_shards <= 0:
+            raise ValueError(
+                f"Number of shards must be greater than 0, got {num_shards}"
+            )
+        if not 0 <= shard_id < num_shards:
+            raise ValueError(f"Shard id must be in [0, {num_shards}), got {shard_id}")
+        if chunk_size <= 0:
+            raise ValueError(f"Chunk size must be greater than 0, got {chunk_size}")
+        self.output_dir = output_dir
+        self.shard_id = shard_id
+        self.num_shards = num_shards
+        self.chunk_size = chunk_size
+        os.makedirs(output_dir, exist_ok=True)
+
+    def owns(self, rel_path: str) -> bool:
+        # crc32 rather than hash(), which is salted per process
+        return zlib.crc32(rel_path.encode("utf-8")) % self.num_shards == self.shard_id
+
+    def _prefix(self, shard_id: int) -> str:
+        return os.path.join(
+            self.output_dir, f"shard-{shard_id:04d}-of-{self.num_shards:04d}"
+        )
+
+    def _chunk_files(self, shard_id: Optional[int] = None) -> List[str]:
+        if shard_id is None:
+            pattern = os.path.join(
+                self.output_dir, f"shard-*-of-{self.num_shards:04d}-*.npz"
+            )
+        else:
+            pattern = f"{self._prefix(shard_id)}-*.npz"
+        return sorted(glob.glob(pattern))
+
+    def _next_chunk_index(self) -> int:
+        """One past the highest chunk number of this shard on disk.
+
+        Not the number of chunks: a deleted chunk leaves a gap, and counting
+        would then reuse, and overwrite, the number of the last one.
+        """
+        numbers = []
+        for path in self._chunk_files(self.shard_id):
+            number = os.path.splitext(os.path.basename(path))[0].rsplit("-", 1)[1]
+            if number.isdigit():
+                numbers.append(int(number))
+        return max(numbers, default=-1) + 1
+
+    def _progress_path(self, shard_id: int) -> str:
+        return f"{self._prefix(shard_id)}.progress.json"
+
+    def read_progress(self, shard_id: int) -> dict:
+        try:
+            with open(self._progress_path(shard_id), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"chunks": 0, "indexed": 0, "skipped": 0, "complete": False}
+
+    def _write_progress(self, progress: dict):
+        path = self._progress_path(self.shard_id)
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(progress, f)
+        os.replace(f"{path}.tmp", path)
+
+    def _completed_paths(self) -> Tuple[Set[str], Set[str]]:
+        indexed, skipped = set(), set()
+        for path in self._chunk_files(self.shard_id):
+            with np.load(path) as chunk:
+                indexed.update(chunk["paths"].tolist())
+                skipped.update(chunk["skipped"].tolist())
+        return indexed, skipped
+
+    def _write_chunk(
+        self,
+        index: int,
+        features: np.ndarray,
+        labels: List[str],
+        paths: List[str],
+        stats: List[os.stat_result],
+        skipped: List[str],
+    ):
+        path = f"{self._prefix(self.shard_id)}-{index:06d}.npz"
+        with open(f"{path}.tmp", "wb") as f:
+            np.savez(
+                f,
+                features=features,
+                labels=np.array(labels, dtype=str),
+                paths=np.array(paths, dtype=str),
+                sizes=np.array([st.st_size for st in stats], dtype=np.int64),
+                mtimes=np.array([st.st_mtime_ns for st in stats], dtype=np.int64),
+                skipped=np.array(skipped, dtype=str),
+            )
+        os.replace(f"{path}.tmp", path)
+
+    def run(self, extractor, data_loader: DataLoader) -> int:
+        """Index this shard's images, resuming after any chunks already on disk.
+
+        Returns the number of images newly indexed.
+        """
+        progress = self.read_progress(self.shard_id)
+        model = extractor.__class__.__name__
+        if progress.get("model", model) != model:
+            raise ValueError(
+                f"Shard {self.shard_id} was indexed with {progress['model']}, not {model}."
+            )
+        indexed_paths, skipped_paths = self._completed_paths()
+        done = indexed_paths | skipped_paths
+        if done:
+            logger.info(
+                f"Resuming shard {self.shard_id}/{self.num_shards}: {len(indexed_paths)} images already indexed."
+            )
+        # Recount from the chunks on disk; the progress file may predate a lost chunk
+        progress.update(
+            model=model,
+            indexed=len(indexed_paths),
+            skipped=len(skipped_paths),
+            complete=False,
+        )
+        progress["chunks"] = len(self._chunk_files(self.shard_id))
+        next_chunk = self._next_chunk_index()
+        indexed = 0
+
+        root = data_loader.data_path
+        pending = (
+            (path, label, stat)
+            for path, label, stat in data_loader.scan()
+            if self._pending(path, root, done)
+        )
+        for chunk in chunked(pending, self.chunk_size):
+            paths, labels, stats = map(list, zip(*chunk))
+            stats_by_path = dict(zip(paths, stats))
+            feature_chunks, valid_paths, valid_labels = [], [], []
+            for features, batch_paths, batch_labels in extractor.iter_paths(
+                paths, labels
+            ):
+                feature_chunks.append(features)
+                valid_paths.extend(batch_paths)
+                valid_labels.extend(batch_labels)
+            features = (
+                np.concatenate(feature_chunks)
+                if feature_chunks
+                else np.empty((0, extractor.feature_dim), dtype=np.float32)
+            )
+            valid = set(valid_paths)
+            self._write_chunk(
+                next_chunk,
+                features,
+                valid_labels,
+                [os.path.relpath(p, root) for p in valid_paths],
+                [stats_by_path[p] for p in valid_paths],
+                [os.path.relpath(p, root) for p in paths if p not in valid],
+            )
+            next_chunk += 1
+            indexed += len(valid_paths)
+            progress["chunks"] += 1
+            progress["indexed"] += len(valid_paths)
+            progress["skipped"] += len(paths) - len(valid)
+            self._write_progress(progress)
+            logger.info(
+                f"Shard {self.shard_id}/{self.num_shards}: wrote chunk {next_chunk - 1}, "
+                f"{progress['indexed']} images indexed so far."
+            )
+
+        progress["complete"] = True
+        self._write_progress(progress)
+        logger.info(
+            f"Shard {self.shard_id}/{self.num_shards} complete: {indexed} new images indexed."
+        )
+        return indexed
+
+    def _pending(self, path: str, data_path: str, done: Set[str]) -> bool:
+        rel_path = os.path.relpath(path, data_path)
+        return self.owns(rel_path) and rel_path not in done
+
+    def merge(
+        self,
+        database: FeatureDatabase,
+        manifest: Optional[Manifest] = None,
+        allow_partial: bool = False,
+    ) -> int:
+        """Add every shard's chunks to an empty ``database`` and save it.
+
+        With a ``manifest``, the merged files are recorded so a later sync
+        only has to look at what changed since indexing.
+        """
+        if database.ntotal:
+            raise ValueError(
+                f"Refusing to merge into a database that already holds {database.ntotal} vectors."
+            )
+        incomplete = [
+            shard_id
+            for shard_id in range(self.num_shards)
+            if not self.read_progress(shard_id)["complete"]
+        ]
+        if incomplete and not allow_partial:
+            raise RuntimeError(
+                f"Shards {incomplete} of {self.num_shards} have not finished indexing."
+            )
+        total = 0
+        entries = []
+        with database.write_batch():
+            for path in self._chunk_files():
+                with np.load(path) as chunk:
+                    features = chunk["features"]
+                    labels = chunk["labels"].tolist()
+                    paths = chunk["paths"].tolist()
+                    sizes = chunk["sizes"].tolist()
+                    mtimes = chunk["mtimes"].tolist()
+                if labels:
+                    ids = database.add_features(features, labels).tolist()
+                    entries.extend(
+                        ManifestEntry(*row, None, vector_id)
+                        for vector_id, *row in zip(ids, paths, labels, sizes, mtimes)
+                    )
+                    total += len(labels)
+        database.save_database()
+        if manifest is not None:
+            manifest.upsert(entries)
+        logger.info(f"Merged {total} vectors from {self.num_shards} shards.")
+        return total
@@ -0,0 +1,99 @@
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple
+import faiss
+import numpy as np
+
+
+@dataclass(frozen=True)
+class IndexSnapshot:
+    """One published generation of the feature database.
+
+    The index, label ids and raw vectors here are never mutated once
+    published: writers change a private copy and publish it as the next
+    generation. A reader that takes a snapshot once and uses it for both
+    the search and the label lookups therefore always sees labels that
+    belong to the vectors it found, however many writes land meanwhile.
+
+    Vectors appended since the index was last copied live in ``delta``,
+    a read-only view of consecutive ids from ``delta_start`` that is
+    scanned exactly and merged with the index results.
+    """
+
+    generation: int
+    index: Any
+    # Class id per vector id, -1 for removed ids; read-only
+    class_ids: np.ndarray
+    # Class names by class id, with a trailing "Unknown" for class id -1
+    names: np.ndarray
+    raw_vectors: Optional[np.ndarray] = None
+    rerank_factor: int = 0
+    delta: Optional[np.ndarray] = None
+    delta_start: int = 0
+
+    @property
+    def ntotal(self) -> int:
+        return self.index.ntotal + (len(self.delta) if self.delta is not None else 0)
+
+    @property
+    def class_names(self) -> List[str]:
+        return self.names[:-1].tolist()
+
+    @property
+    def num_classes(self) -> int:
+        return len(self.names) - 1
+
+    def class_ids_for(self, indices: np.ndarray) -> np.ndarray:
+        """Integer class ids for an array of vector ids, -1 if unknown or removed."""
+        indices = np.asarray(indices)
+        if not len(self.class_ids):
+            return np.full(indices.shape, -1, dtype=np.int32)
+        valid = (indices >= 0) & (indices < len(self.class_ids))
+        return np.where(valid, self.class_ids[np.where(valid, indices, 0)], -1)
+
+    def names_for(self, indices: np.ndarray) -> np.ndarray:
+        """Class names for an array of vector ids, in the same shape."""
+        return self.names[self.class_ids_for(indices)]
+
+    def search(
+        self, query_features: np.ndarray, k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        distances, indices = self._search_index(query_features, k)
+        if self.delta is None or not len(self.delta):
+            return distances, indices
+        delta_distances, delta_indices = faiss.knn(
+            query_features, self.delta, min(k, len(self.delta))
+        )
+        delta_indices = np.where(
+            delta_indices >= 0, delta_indices + self.delta_start, -1
+        )
+        distances = np.concatenate([distances, delta_distances], axis=1)
+        indices = np.concatenate([indices, delta_indices], axis=1)
+        order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+        return (
+            np.take_along_axis(distances, order, axis=1),
+            np.take_along_axis(indices, order, axis=1),
+        )
+
+    def _search_index(
+        self, query_features: np.ndarray, k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        if self.raw_vectors is not None and self.rerank_factor > 1:
+            # Search the compressed index wide, then re-rank with exact distances
+            _, candidates = self.index.search(query_features, k * self.rerank_factor)
+            return self._rerank(query_features, candidates, k)
+        return self.index.search(query_features, k)
+
+    def _rerank(
+        self, query_features: np.ndarray, candidates: np.ndarray, k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        valid = candidates >= 0
+        vectors = self.raw_vectors[np.where(valid, candidates, 0)]
+        distances = ((vectors - query_features[:, None, :]) ** 2).sum(axis=-1)
+        distances = np.where(valid, distances, np.inf).astype(np.float32)
+        order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+        distances = np.take_along_axis(distances, order, axis=1)
+        indices = np.take_along_axis(candidates, order, axis=1)
+        # Match FAISS padding for queries with fewer than k candidates
+        indices[np.isinf(distances)] = -1
+        distances[np.isinf(distances)] = np.finfo(np.float32).max
+        return distances, indices
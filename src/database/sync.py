@@ -0,0 +1,132 @@
+import os
+from typing import Dict, List
+import numpy as np
+from src.data.data_loader import DataLoader
+from src.data.manifest import Manifest, ManifestEntry
+from src.database.feature_database import FeatureDatabase
+from src.utils.helpers import chunked, image_digest, is_image_file
+from src.utils.logger import logger
+from src.config.settings import Settings
+
+
+def sync_database(
+    data_loader: DataLoader,
+    feature_extractor,
+    feature_db: FeatureDatabase,
+    manifest: Manifest,
+    chunk_size: int = Settings.INDEX_CHUNK_SIZE,
+) -> Dict[str, int]:
+    """Bring the database in line with the data directory.
+
+    Files whose size and mtime match the manifest are skipped; a file whose
+    mtime changed but whose content hash did not is only re-stamped. New and
+    changed files are extracted and added, and vectors for deleted or changed
+    files (or vectors no manifest entry accounts for) are removed.
+    """
+    entries = manifest.entries()
+    known = dict(entries)
+    live_ids = feature_db.ids
+    live = np.zeros(len(feature_db.label_store), dtype=bool)
+    live[live_ids] = True
+    stale: List[str] = []
+    restamped: List[ManifestEntry] = []
+    pending = []
+    unchanged = 0
+    for path, label, stat in data_loader.scan():
+        rel_path = os.path.relpath(path, data_loader.data_path)
+        entry = known.pop(rel_path, None)
+        if (
+            entry is not None
+            # Ids past the label store were never persisted; re-index the file
+            and (
+                entry.vector_id < 0
+                or (entry.vector_id < len(live) and live[entry.vector_id])
+            )
+            and entry.label == label
+            and entry.size == stat.st_size
+        ):
+            if entry.mtime_ns == stat.st_mtime_ns:
+                unchanged += 1
+                continue
+            # Touched but possibly not modified; hashing is cheaper than the model
+            if entry.digest is not None and entry.digest == image_digest(path):
+                entry.mtime_ns = stat.st_mtime_ns
+                restamped.append(entry)
+                unchanged += 1
+                continue
+        if entry is not None:
+            stale.append(rel_path)
+        pending.append((path, label, stat))
+    # Whatever the scan did not visit has been deleted, except files it skips
+    # by extension; those are left alone rather than treated as removed
+    stale.extend(
+        path
+        for path in known
+        if is_image_file(path)
+        or not os.path.exists(os.path.join(data_loader.data_path, path))
+    )
+
+    manifest.upsert(restamped)
+
+    # Drop vectors of stale files and any that no manifest entry accounts for
+    stale_set = set(stale)
+    referenced = [
+        e.vector_id
+        for path, e in entries.items()
+        if path not in stale_set and e.vector_id >= 0
+    ]
+    orphans = np.setdiff1d(live_ids, referenced)
+    if stale:
+        manifest.remove(stale)
+    if len(orphans) and not entries:
+        logger.warning(
+            f"No manifest entries for the {len(orphans)} vectors in the database; re-indexing {data_loader.data_path}."
+        )
+    # One new generation for the whole sync rather than an index copy per chunk
+    with feature_db.write_batch():
+        removed = feature_db.remove_ids(orphans)
+
+        added = skipped = 0
+        new_entries = []
+        for chunk in chunked(pending, chunk_size):
+            paths, labels, _ = map(list, zip(*chunk))
+            features, valid_paths, valid_labels = [], [], []
+            for batch, batch_paths, batch_labels in feature_extractor.iter_paths(
+                paths, labels
+            ):
+                features.append(batch)
+                valid_paths.extend(batch_paths)
+                valid_labels.extend(batch_labels)
+            ids = {}
+            if features:
+                new_ids = feature_db.add_features(
+                    np.concatenate(features), valid_labels
+                )
+                ids = dict(zip(valid_paths, new_ids.tolist()))
+            for path, label, stat in chunk:
+                vector_id = ids.get(path, -1)
+                # Undecodable files are recorded too so they are not retried every sync
+                new_entries.append(
+                    ManifestEntry(
+                        os.path.relpath(path, data_loader.data_path),
+                        label,
+                        stat.st_size,
+                        stat.st_mtime_ns,
+                        image_digest(path) if vector_id >= 0 else None,
+                        vector_id,
+                    )
+                )
+            added += len(valid_paths)
+            skipped += len(chunk) - len(valid_paths)
+
+    if removed or added:
+        feature_db.save_database()
+    manifest.upsert(new_entries)
+    result = {
+        "added": added,
+        "removed": removed,
+        "unchanged": unchanged,
+        "skipped": skipped,
+    }
+    logger.info(f"Synced {data_loader.data_path} with the feature database: {result}")
+    return result
@@ -0,0 +1,94 @@
+import os
+from typing import Optional
+
+import numpy as np
+
+
+class VectorStore:
+    """Growable float32 matrix of raw feature vectors, one row per vector id.
+
+    Compressed FAISS indexes only keep lossy codes, so the database keeps the
+    original vectors here for exact re-ranking and for retraining. Without a
+    ``path`` the rows are held in memory. With one they live in a headerless
+    float32 file: appends are written to its end and rows are read through a
+    read-only memory map, so they take page cache instead of process memory
+    and are only paged in when something reads them.
+    """
+
+    def __init__(
+        self, feature_dim: int, capacity: int = 1024, path: Optional[str] = None
+    ):
+        self.feature_dim = feature_dim
+        self.path = path
+        self._size = 0
+        if path is None:
+            self._data = np.empty((capacity, feature_dim), dtype=np.float32)
+            return
+        # Create the file if needed; a torn trailing row is overwritten later
+        with open(path, "ab") as f:
+            self._size = f.tell() // self._row_bytes
+        self._map()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def _row_bytes(self) -> int:
+        return self.feature_dim * np.dtype(np.float32).itemsize
+
+    @property
+    def resident(self) -> bool:
+        """Whether the rows are held in process memory rather than mapped."""
+        return self.path is None
+
+    @property
+    def array(self) -> np.ndarray:
+        return self._data[: self._size]
+
+    def _map(self):
+        if self._size:
+            self._data = np.memmap(
+                self.path,
+                dtype=np.float32,
+                mode="r",
+                shape=(self._size, self.feature_dim),
+            )
+        else:
+            # Empty files cannot be mapped
+            self._data = np.empty((0, self.feature_dim), dtype=np.float32)
+
+    def append(self, features: np.ndarray):
+        end = self._size + len(features)
+        if self.path is not None:
+            with open(self.path, "r+b") as f:
+                f.seek(self._size * self._row_bytes)
+                f.write(np.ascontiguousarray(features, dtype=np.float32).tobytes())
+            # Earlier maps stay valid for the rows they cover
+            self._size = end
+            self._map()
+            return
+        if end > len(self._data):
+            # Grow geometrically so repeated small appends stay amortised O(1)
+            grown = np.empty(
+                (max(end, 2 * len(self._data)), self.feature_dim), dtype=np.float32
+            )
+            grown[: self._size] = self._data[: self._size]
+            self._data = grown
+        self._data[self._size : end] = features
+        self._size = end
+
+    def take(self, indices: np.ndarray) -> np.ndarray:
+        return self._data[: self._size][indices]
+
+    def truncate(self, size: int):
+        """Drop every row from ``size`` on."""
+        self._size = min(size, self._size)
+        if self.path is not None:
+            os.truncate(self.path, self._size * self._row_bytes)
+            self._map()
+
+    def flush(self):
+        """Make the rows written so far durable."""
+        if self.path is not None:
+            with open(self.path, "rb+") as f:
+                os.fsync(f.fileno())
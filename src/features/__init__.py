@@ -1 +1,15 @@
-from .resnet_extractor import ResNetExtractor
+import importlib
+
+# Extractors import torch and torchvision, so load them only when first used
+_EXTRACTORS = {
+    "ResNetExtractor": ".resnet_extractor",
+    "DenseNetExtractor": ".densenet_extractor",
+}
+
+__all__ = list(_EXTRACTORS)
+
+
+def __getattr__(name):
+    if name in _EXTRACTORS:
+        return getattr(importlib.import_module(_EXTRACTORS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
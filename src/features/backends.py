@@ -0,0 +1,153 @@
+import io
+import os
+import tempfile
+from typing import Callable
+import numpy as np
+import torch
+from src.utils.logger import logger
+from src.config.settings import Settings
+
+BACKENDS = ("eager", "torchscript", "compile", "int8", "onnx", "onnx_int8")
+# Quantized kernels and ONNX Runtime sessions here only run on the CPU
+CPU_BACKENDS = ("int8", "onnx", "onnx_int8")
+
+# Maps a CPU NCHW batch to a float32 (batch, feature_dim) array
+Runner = Callable[[torch.Tensor], np.ndarray]
+
+
+def configure_threads(
+    intra_op: int = Settings.TORCH_NUM_THREADS,
+    inter_op: int = Settings.TORCH_INTEROP_THREADS,
+):
+    """Size PyTorch's intra-op and inter-op thread pools; 0 keeps the default."""
+    if intra_op > 0:
+        torch.set_num_threads(intra_op)
+    if inter_op > 0 and torch.get_num_interop_threads() != inter_op:
+        try:
+            torch.set_num_interop_threads(inter_op)
+        except RuntimeError as e:
+            # Only allowed before the process has run any inter-op parallel work
+            logger.warning(f"Cannot set inter-op threads to {inter_op}: {e}")
+
+
+def build_runner(
+    model: torch.nn.Module,
+    example: torch.Tensor,
+    backend: str,
+    device: torch.device,
+    channels_last: bool = False,
+) -> Runner:
+    """Wrap an eval-mode model in the requested inference backend.
+
+    ``example`` is a representative CPU batch used to trace or export the
+    model. With ``channels_last`` the model (in place) and its inputs use the
+    NHWC memory layout, which oneDNN convolutions run faster on.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend must be one of {BACKENDS}, got {backend}")
+    if backend in CPU_BACKENDS and device.type != "cpu":
+        raise ValueError(f"Backend '{backend}' only runs on the CPU, not {device}.")
+    if backend in ("onnx", "onnx_int8"):
+        return _onnx_runner(model, example, quantize=backend == "onnx_int8")
+
+    if backend == "int8":
+        model = _quantize_dynamic(model)
+    if channels_last:
+        model = model.to(memory_format=torch.channels_last)
+    if backend == "torchscript":
+        with torch.no_grad():
+            model = torch.jit.freeze(
+                torch.jit.trace(model, _prepare(example, device, channels_last))
+            )
+    elif backend == "compile":
+        model = torch.compile(model)
+
+    def run(batch: torch.Tensor) -> np.ndarray:
+        with torch.inference_mode():
+            features = model(_prepare(batch, device, channels_last))
+        return _to_numpy(features)
+
+    return run
+
+
+def max_relative_error(reference: np.ndarray, features: np.ndarray) -> float:
+    """Largest per-row L2 error of ``features``, relative to the reference norm."""
+    error = np.linalg.norm(features - reference, axis=1)
+    norm = np.maximum(np.linalg.norm(reference, axis=1), 1e-12)
+    return float((error / norm).max())
+
+
+def _prepare(batch: torch.Tensor, device: torch.device, channels_last: bool):
+    if channels_last:
+        return batch.to(device, memory_format=torch.channels_last)
+    return batch.to(device)
+
+
+def _to_numpy(features: torch.Tensor) -> np.ndarray:
+    return features.reshape(features.shape[0], -1).cpu().numpy().astype(np.float32)
+
+
+def _quantize_dynamic(model: torch.nn.Module) -> torch.nn.Module:
+    if not any(isinstance(m, torch.nn.Linear) for m in model.modules()):
+        logger.warning(
+            "Dynamic int8 quantization only covers Linear layers and this model has none; "
+            "use the 'onnx_int8' backend to quantize convolutions."
+        )
+    return torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+
+
+def _onnx_runner(
+    model: torch.nn.Module, example: torch.Tensor, quantize: bool
+) -> Runner:
+    try:
+        import onnxruntime as ort
+    except ImportError:
+        raise ImportError(
+            "The ONNX backends need onnxruntime: pip install onnxruntime"
+        ) from None
+
+    buffer = io.BytesIO()
+    torch.onnx.export(
+        model,
+        (example,),
+        buffer,
+        input_names=["images"],
+        output_names=["features"],
+        dynamic_axes={"images": {0: "batch"}, "features": {0: "batch"}},
+        dynamo=False,
+    )
+    model_bytes = buffer.getvalue()
+    if quantize:
+        model_bytes = _quantize_onnx(model_bytes)
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if Settings.TORCH_NUM_THREADS > 0:
+        options.intra_op_num_threads = Settings.TORCH_NUM_THREADS
+    if Settings.TORCH_INTEROP_THREADS > 0:
+        options.inter_op_num_threads = Settings.TORCH_INTEROP_THREADS
+    session = ort.InferenceSession(
+        model_bytes, options, providers=["CPUExecutionProvider"]
+    )
+
+    def run(batch: torch.Tensor) -> np.ndarray:
+        (features,) = session.run(None, {"images": batch.numpy()})
+        return features.reshape(features.shape[0], -1).astype(np.float32)
+
+    return run
+
+
+def _quantize_onnx(model_bytes: bytes) -> bytes:
+    # Unlike torch's dynamic quantization, ONNX Runtime's also covers Conv
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "model.onnx")
+        target = os.path.join(tmp, "model.int8.onnx")
+        with open(source, "wb") as f:
+            f.write(model_bytes)
+        quantize_dynamic(source, target, weight_type=QuantType.QUInt8)
+        with open(target, "rb") as f:
+            return f.read()
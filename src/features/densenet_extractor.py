@@ -2,23 +2,24 @@ from typing import Union
 from PIL import Image
 import numpy as np
 import torch
-from torchvision import models, transforms
+from torchvision import transforms
 from .feature_extractor import FeatureExtractor
 from src.utils.logger import logger
 from src.config.settings import Settings
 
 
-class ResNetExtractor(FeatureExtractor):
+class DenseNetExtractor(FeatureExtractor):
     def __init__(
         self,
         device: Union[torch.device, None] = None,
+        backend: str = Settings.INFERENCE_BACKEND,
     ):
-        super().__init__(device)
+        # The base class runs the transform to check the inference backend
         self.transform = self._get_transform()
-        self.model.eval()
+        super().__init__(device, backend)
 
     def _load_model(self):
-        model = getattr(models, "densenet121")(pretrained=True)
+        model = self._pretrained("densenet121")
         feature_dim = model.classifier.in_features
         model = torch.nn.Sequential(
             *list(model.features),
@@ -52,8 +53,4 @@ class ResNetExtractor(FeatureExtractor):
             except Exception as e:
                 logger.error(f"Error loading image {image}: {e}")
                 return np.array([])
-        with torch.no_grad():
-            image = self.transform(image).unsqueeze(0).to(self.device)
-            features = self.model(image)
-            features = features.cpu().numpy().flatten()
-        return features
+        return self.forward(self.transform(image).unsqueeze(0))[0]
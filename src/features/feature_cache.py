@@ -0,0 +1,173 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+import numpy as np
+from src.utils.logger import logger
+from src.config.settings import Settings
+
+
+class FeatureCache:
+    """LRU cache of feature vectors keyed by image content hash and model name.
+
+    Entries are evicted once ``max_entries`` is exceeded or after ``ttl``
+    seconds (0 disables expiry). With ``cache_dir`` set, entries are also
+    written there as ``.npy`` files so they survive restarts; the oldest files
+    are deleted once they take more than ``max_disk_bytes``, and expired ones
+    at start-up and as newer files are written. Callers get their own copy of
+    cached arrays, so modifying one does not change the cache.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = Settings.FEATURE_CACHE_SIZE,
+        ttl: float = Settings.FEATURE_CACHE_TTL,
+        cache_dir: Optional[str] = Settings.FEATURE_CACHE_DIR or None,
+        max_disk_bytes: int = Settings.FEATURE_CACHE_DISK_BYTES,
+    ):
+        if max_entries <= 0:
+            raise ValueError(f"Cache size must be greater than 0, got {max_entries}")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._entries: "OrderedDict[str, Tuple[np.ndarray, float]]" = OrderedDict()
+        # Size and mtime of each file on disk, oldest write first
+        self._disk_files: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._scan_disk()
+
+    @staticmethod
+    def make_key(model_name: str, digest: str) -> str:
+        return f"{model_name}-{digest}"
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry[1], now):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0].copy()
+            if entry is not None:
+                del self._entries[key]
+        features = self._read_disk(key, now)
+        with self._lock:
+            if features is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._insert(key, features, now)
+        return features.copy()
+
+    def put(self, key: str, features: np.ndarray):
+        now = time.time()
+        features = features.copy()
+        with self._lock:
+            self._insert(key, features, now)
+        self._write_disk(key, features)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _insert(self, key: str, features: np.ndarray, created: float):
+        self._entries[key] = (features, created)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl > 0 and now - created > self.ttl
+
+    def _disk_path(self, key: str) -> str:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.npy")
+
+    def _read_disk(self, key: str, now: float) -> Optional[np.ndarray]:
+        if not self.cache_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            if self._expired(os.path.getmtime(path), now):
+                os.remove(path)
+                with self._lock:
+                    self._forget_disk(path)
+                return None
+            return np.load(path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Failed to read cached features from {path}: {e}")
+            return None
+
+    def _write_disk(self, key: str, features: np.ndarray):
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, features)
+                size = f.tell()
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Failed to write cached features to {path}: {e}")
+            return
+        with self._lock:
+            self._forget_disk(path)
+            self._disk_files[path] = (size, time.time())
+            self._disk_bytes += size
+            self._evict_disk(time.time())
+
+    def _scan_disk(self):
+        """Index the files left by earlier runs, deleting expired ones."""
+        now = time.time()
+        files = []
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                    # Temporary files are left behind by interrupted writes
+                    if name.endswith(".tmp") or self._expired(stat.st_mtime, now):
+                        os.remove(path)
+                        continue
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, path, stat.st_size))
+        for mtime, path, size in sorted(files):
+            self._disk_files[path] = (size, mtime)
+            self._disk_bytes += size
+        self._evict_disk(now)
+        logger.info(
+            f"Feature cache holds {len(self._disk_files)} files ({self._disk_bytes} bytes) in {self.cache_dir}."
+        )
+
+    def _forget_disk(self, path: str):
+        entry = self._disk_files.pop(path, None)
+        if entry is not None:
+            self._disk_bytes -= entry[0]
+
+    def _evict_disk(self, now: float):
+        """Delete the oldest files while over budget or expired; holds the lock."""
+        while self._disk_files:
+            path, (size, mtime) = next(iter(self._disk_files.items()))
+            if self._disk_bytes <= self.max_disk_bytes and not self._expired(
+                mtime, now
+            ):
+                return
+            self._forget_disk(path)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Failed to evict cached features {path}: {e}")
@@ -1,37 +1,259 @@
+import os
 from abc import ABC, abstractmethod
-from typing import Union, Tuple, Any
+from itertools import chain
+from typing import Union, Tuple, Any, Sequence, List, Optional, Iterator
+from PIL import Image
 import numpy as np
 import torch
-from src.utils.helpers import get_device
+from torchvision import models
+from src.data.prefetcher import ImagePrefetcher
+from src.features.backends import (
+    Runner,
+    build_runner,
+    configure_threads,
+    max_relative_error,
+)
+from src.features.feature_cache import FeatureCache
+from src.utils.helpers import get_device, image_digest
 from src.utils.logger import logger
+from src.utils.metrics import time_stage
+from src.config.settings import Settings
+
+# What the deprecated ``pretrained=True`` loaded. Indexes and cached features
+# are only comparable under the same weights, so changing this needs a re-index
+PRETRAINED_WEIGHTS = "IMAGENET1K_V1"
+
+
+def weights_file(arch: str, weights_path: Optional[str] = None) -> str:
+    """Where ``_pretrained`` keeps the ``PRETRAINED_WEIGHTS`` of ``arch``."""
+    weights_path = weights_path or Settings.WEIGHTS_PATH
+    return os.path.join(weights_path, f"{arch}.{PRETRAINED_WEIGHTS}.pth")
 
 
 class FeatureExtractor(ABC):
+    """Base class for image feature extractors.
+
+    Subclasses provide the model and set ``self.transform`` before calling
+    ``__init__``. The model runs through the chosen inference ``backend``
+    (see ``src.features.backends``); non-eager backends are checked against
+    the eager float32 model on start-up and fall back to it if their
+    embeddings differ by more than ``Settings.BACKEND_TOLERANCE``.
+    """
+
+    # Name of the pretrained weights, set by ``_pretrained``
+    weights: Optional[str] = None
+
     def __init__(
         self,
         device: Union[torch.device, None] = None,
+        backend: str = Settings.INFERENCE_BACKEND,
     ):
         self.device = device or get_device()
+        configure_threads()
         self.model, self.feature_dim = self.load_model()
+        self.model.eval()
+        self.backend = backend
+        self._runner = self._build_runner(backend)
+        self.cache = FeatureCache() if Settings.FEATURE_CACHE_SIZE > 0 else None
         logger.info(
-            f"Feature extractor initialized with model: {self.model.__class__.__name__} on device: {self.device}"
+            f"Feature extractor initialized with model: {self.model.__class__.__name__} "
+            f"on device: {self.device}, backend: {self.backend}"
         )
 
     def __repr__(self) -> str:
         return self.__str__()
 
     def __str__(self) -> str:
-        return f"{self.__class__.__name__} with model {self.model.__class__.__name__}"
+        return f"{self.__class__.__name__} with model {self.model.__class__.__name__} ({self.backend})"
 
     def __call__(self, *args: Any, **kwds: Any) -> np.ndarray:
+        image = args[0] if args else kwds.get("image")
+        key = self._cache_key(image)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
         result = self._extract(*args, **kwds)
         # Check type of result
         if not isinstance(result, np.ndarray):
             raise TypeError(
                 f"Expected np.ndarray from feature extractor, got {type(result)}"
             )
+        if key is not None and result.size > 0:
+            self.cache.put(key, result)
         return result
 
+    def extract_batch(
+        self,
+        images: Sequence[Union[Image.Image, str]],
+        batch_size: int = Settings.BATCH_SIZE,
+        digests: Optional[Sequence[Optional[str]]] = None,
+    ) -> np.ndarray:
+        """Extract features for many images, running the model in mini-batches.
+
+        Returns a float32 array of shape (len(images), feature_dim) whose rows
+        follow the order of ``images``. ``digests`` are content hashes of the
+        images' encoded bytes used as cache keys; without them the cache is
+        keyed by file bytes or decoded pixels.
+        """
+        if batch_size <= 0:
+            raise ValueError(f"Batch size must be greater than 0, got {batch_size}")
+        features = np.empty((len(images), self.feature_dim), dtype=np.float32)
+        digests = digests or [None] * len(images)
+        keys = [
+            self._cache_key(image, digest) for image, digest in zip(images, digests)
+        ]
+        pending = []
+        for i, key in enumerate(keys):
+            cached = self.cache.get(key) if key is not None else None
+            if cached is not None:
+                features[i] = cached
+            else:
+                pending.append(i)
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start : start + batch_size]
+            batch = torch.stack([self.preprocess(images[i]) for i in chunk])
+            features[chunk] = self.forward(batch)
+            for i in chunk:
+                if keys[i] is not None:
+                    self.cache.put(keys[i], features[i].copy())
+        logger.debug(
+            "Extracted features for {} images in batches of {}.",
+            len(images),
+            batch_size,
+        )
+        return features
+
+    def extract_paths(
+        self,
+        image_paths: List[str],
+        labels: List[str],
+        batch_size: int = Settings.BATCH_SIZE,
+        num_workers: int = Settings.NUM_WORKERS,
+    ) -> Tuple[np.ndarray, List[str]]:
+        """Extract features for image files, decoding them on prefetch workers.
+
+        Images that cannot be loaded are skipped; the returned labels line up
+        with the rows of the returned feature array.
+        """
+        feature_chunks = []
+        valid_labels = []
+        for features, _, batch_labels in self.iter_paths(
+            image_paths, labels, batch_size, num_workers
+        ):
+            feature_chunks.append(features)
+            valid_labels.extend(batch_labels)
+        if not feature_chunks:
+            return np.empty((0, self.feature_dim), dtype=np.float32), []
+        logger.info(
+            f"Extracted features for {len(valid_labels)} of {len(image_paths)} images."
+        )
+        return np.concatenate(feature_chunks), valid_labels
+
+    def iter_paths(
+        self,
+        image_paths: List[str],
+        labels: List[str],
+        batch_size: int = Settings.BATCH_SIZE,
+        num_workers: int = Settings.NUM_WORKERS,
+    ) -> Iterator[Tuple[np.ndarray, List[str], List[str]]]:
+        """Yield ``(features, paths, labels)`` per batch of decodable images."""
+        prefetcher = ImagePrefetcher(self.transform, num_workers=num_workers)
+        for batch, batch_paths, batch_labels in prefetcher.batches(
+            image_paths, labels, batch_size
+        ):
+            yield self.forward(batch), batch_paths, batch_labels
+
+    def _cache_key(
+        self, image: Union[Image.Image, str, None], digest: Optional[str] = None
+    ) -> Optional[str]:
+        if self.cache is None or image is None:
+            return None
+        if digest is None:
+            try:
+                digest = image_digest(image)
+            except OSError:
+                return None
+        model_name = self.__class__.__name__
+        if self.weights is not None:
+            model_name = f"{model_name}-{self.weights}"
+        if self.backend != "eager":
+            # Approximate backends must not share entries with the reference model
+            model_name = f"{model_name}-{self.backend}"
+        return FeatureCache.make_key(model_name, digest)
+
+    def preprocess(self, image: Union[Image.Image, str]) -> torch.Tensor:
+        """Turn an image (or a path to one) into a model-ready CHW tensor."""
+        if isinstance(image, str):
+            with time_stage("decode"):
+                image = Image.open(image).convert("RGB")
+        with time_stage("preprocess"):
+            return self.transform(image)
+
+    def forward(self, batch: torch.Tensor) -> np.ndarray:
+        """Run a stacked NCHW batch through the model, one feature row per image."""
+        with time_stage("forward"):
+            return self._runner(batch)
+
+    def _build_runner(self, backend: str) -> Runner:
+        # Synthetic noise images give the backend a representative input
+        rng = np.random.default_rng(0)
+        example = torch.stack(
+            [
+                self.transform(
+                    Image.fromarray(rng.integers(0, 256, (256, 256, 3), np.uint8))
+                )
+                for _ in range(2)
+            ]
+        )
+        eager = build_runner(self.model, example, "eager", self.device)
+        if backend == "eager" and not Settings.CHANNELS_LAST:
+            return eager
+        reference = eager(example)
+        runner = build_runner(
+            self.model, example, backend, self.device, Settings.CHANNELS_LAST
+        )
+        error = max_relative_error(reference, runner(example))
+        if error > Settings.BACKEND_TOLERANCE:
+            logger.error(
+                f"Backend '{backend}' embeddings differ from the eager model by {error:.4f} "
+                f"(tolerance {Settings.BACKEND_TOLERANCE}); using the eager model."
+            )
+            self.backend = "eager"
+            return build_runner(self.model, example, "eager", self.device)
+        logger.info(
+            f"Backend '{backend}' embeddings are within {error:.2e} of the eager model."
+        )
+        return runner
+
+    def _pretrained(self, arch: str) -> torch.nn.Module:
+        """A torchvision ``arch`` with its ``PRETRAINED_WEIGHTS``.
+
+        Weights are read from ``<WEIGHTS_PATH>/<arch>.<PRETRAINED_WEIGHTS>.pth``.
+        If that file is missing and downloads are allowed, they are fetched
+        once and saved there, so later starts never touch the network.
+        """
+        self.weights = PRETRAINED_WEIGHTS
+        path = weights_file(arch)
+        if not os.path.exists(path):
+            if not Settings.ALLOW_WEIGHTS_DOWNLOAD:
+                raise FileNotFoundError(
+                    f"No weights for {arch} at {path} and downloads are disabled."
+                )
+            logger.info(f"Downloading {arch} weights to {path}.")
+            weights = models.get_model_weights(arch)[PRETRAINED_WEIGHTS]
+            model = models.get_model(arch, weights=weights)
+            os.makedirs(Settings.WEIGHTS_PATH, exist_ok=True)
+            torch.save(model.state_dict(), f"{path}.tmp")
+            os.replace(f"{path}.tmp", path)
+            return model
+        # Build on the meta device so no time is spent on random initialisation
+        with torch.device("meta"):
+            model = models.get_model(arch, weights=None)
+        state_dict = torch.load(path, map_location="cpu", weights_only=True, mmap=True)
+        model.load_state_dict(state_dict, assign=True)
+        return model
+
     def load_model(self) -> Tuple[Any, int]:
         model, feature_dim = self._load_model()
         if not isinstance(feature_dim, int):
@@ -46,6 +268,11 @@ class FeatureExtractor(ABC):
             raise ValueError("Model not loaded")
         return model, feature_dim
 
+    def memory_bytes(self) -> int:
+        """Bytes held by the model's parameters and buffers."""
+        tensors = chain(self.model.parameters(), self.model.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+
     @abstractmethod
     def _load_model(self) -> Tuple[Any, int]:
         raise NotImplementedError("Subclasses must implement _load_model")
@@ -2,22 +2,24 @@ from typing import Union
 from PIL import Image
 import numpy as np
 import torch
-from torchvision import models, transforms
+from torchvision import transforms
 from .feature_extractor import FeatureExtractor
 from src.utils.logger import logger
+from src.config.settings import Settings
 
 
 class ResNetExtractor(FeatureExtractor):
     def __init__(
         self,
         device: Union[torch.device, None] = None,
+        backend: str = Settings.INFERENCE_BACKEND,
     ):
-        super().__init__(device)
+        # The base class runs the transform to check the inference backend
         self.transform = self._get_transform()
-        self.model.eval()
+        super().__init__(device, backend)
 
     def _load_model(self):
-        model = getattr(models, "resnet50")(pretrained=True)
+        model = self._pretrained("resnet50")
         feature_dim = model.fc.in_features
         model = torch.nn.Sequential(*list(model.children())[:-1])
         model.to(self.device)
@@ -47,9 +49,4 @@ class ResNetExtractor(FeatureExtractor):
             except Exception as e:
                 logger.error(f"Error loading image {image}: {e}")
                 return np.array([])
-        with torch.no_grad():
-            image = self.transform(image).unsqueeze(0).to(self.device)
-            features = self.model(image)
-            features = features.cpu().numpy().flatten()
-        return features
-
+        return self.forward(self.transform(image).unsqueeze(0))[0]
@@ -1,14 +1,16 @@
 import argparse
-import numpy as np
+from typing import Any, Tuple
 
 from src.config.settings import Settings
 from src.data.data_loader import DataLoader
-from src.features.feature_extractor import FeatureExtractor
 from src.database.feature_database import FeatureDatabase
+from src.database.shard_indexer import ShardIndexer
+from src.database.sync import sync_database
+from src.data.manifest import Manifest
 from src.search.similarity_search import SimilaritySearch
 from src.classifier.classifier import Classifier
 from src.utils.logger import logger
-from src.utils.helpers import load_image
+from src.utils.helpers import load_image, dynamic_import, model_path
 
 
 def parse_args():
@@ -17,8 +19,8 @@ def parse_args():
         "--mode",
         type=str,
         required=True,
-        choices=["preprocess", "classify"],
-        help="Operation mode: preprocess or classify.",
+        choices=["preprocess", "sync", "classify", "index", "merge"],
+        help="Operation mode: preprocess/sync, classify, index (one shard) or merge (shards).",
     )
     parser.add_argument(
         "--data_path", type=str, default=Settings.DATA_PATH, help="Path to the dataset."
@@ -26,54 +28,111 @@ def parse_args():
     parser.add_argument(
         "--input", type=str, help="Path to input image for classification."
     )
+    parser.add_argument(
+        "--model",
+        type=str,
+        default=Settings.FEATURE_MODEL,
+        help="Feature extractor; each has its own index, manifest and shards.",
+    )
     parser.add_argument(
         "--k",
         type=int,
         default=Settings.K_NEIGHBORS,
         help="Number of neighbors to consider.",
     )
+    parser.add_argument(
+        "--shard_dir",
+        type=str,
+        default=Settings.SHARD_PATH,
+        help="Directory holding feature shards for index/merge.",
+    )
+    parser.add_argument(
+        "--shard_id", type=int, default=0, help="Shard to index (0-based)."
+    )
+    parser.add_argument(
+        "--num_shards", type=int, default=1, help="Total number of shards."
+    )
+    parser.add_argument(
+        "--chunk_size",
+        type=int,
+        default=Settings.INDEX_CHUNK_SIZE,
+        help="Images per checkpointed chunk.",
+    )
+    parser.add_argument(
+        "--allow_partial",
+        action="store_true",
+        help="Merge even if some shards have not finished indexing.",
+    )
     return parser.parse_args()
 
 
-def preprocess(data_path: str = Settings.DATA_PATH):
+def _open(model: str) -> Tuple[Any, FeatureDatabase]:
+    extractor = dynamic_import("src.features", model)()
+    db = FeatureDatabase(
+        feature_dim=extractor.feature_dim,
+        database_path=model_path(Settings.DATABASE_PATH, model),
+    )
+    return extractor, db
+
+
+def sync(data_path: str = Settings.DATA_PATH, model: str = Settings.FEATURE_MODEL):
+    """Extract features for new or changed files and drop those of deleted ones."""
     data_loader = DataLoader(data_path)
-    image_paths, labels = data_loader.load_data()
-
-    extractor = FeatureExtractor()
-    features = []
-    valid_labels = []
-    for path, label in zip(image_paths, labels):
-        image = load_image(path)
-        if image is not None:
-            feat = extractor.extract(image)
-            if feat.size > 0:
-                features.append(feat)
-                valid_labels.append(label)
-            else:
-                logger.warning(f"Feature extraction failed for {path}.")
-        else:
-            logger.warning(f"Image loading failed for {path}. Skipping.")
-    if not features:
-        logger.error("No features extracted. Exiting preprocessing.")
-        return
-    features = np.array(features).astype("float32")
+    extractor, db = _open(model)
+    manifest = Manifest(model_path(Settings.MANIFEST_PATH, model))
+    try:
+        sync_database(data_loader, extractor, db, manifest)
+    finally:
+        manifest.close()
+    if db.ntotal == 0:
+        logger.error("No features extracted from the data directory.")
+
+
+def index(
+    data_path: str = Settings.DATA_PATH,
+    shard_dir: str = Settings.SHARD_PATH,
+    shard_id: int = 0,
+    num_shards: int = 1,
+    chunk_size: int = Settings.INDEX_CHUNK_SIZE,
+    model: str = Settings.FEATURE_MODEL,
+):
+    data_loader = DataLoader(data_path)
+    extractor = dynamic_import("src.features", model)()
+    indexer = ShardIndexer(
+        model_path(shard_dir, model), shard_id, num_shards, chunk_size
+    )
+    indexer.run(extractor, data_loader)
+
 
-    db = FeatureDatabase(feature_dim=Settings.FEATURE_DIMENSION)
-    db.add_features(features, valid_labels)
-    db.save_database()
+def merge(
+    shard_dir: str = Settings.SHARD_PATH,
+    num_shards: int = 1,
+    allow_partial: bool = False,
+    model: str = Settings.FEATURE_MODEL,
+):
+    _, db = _open(model)
+    indexer = ShardIndexer(model_path(shard_dir, model), num_shards=num_shards)
+    manifest = Manifest(model_path(Settings.MANIFEST_PATH, model))
+    try:
+        indexer.merge(db, manifest, allow_partial=allow_partial)
+    finally:
+        manifest.close()
 
 
-def classify(input_path: str, k: int = Settings.K_NEIGHBORS):
-    db = FeatureDatabase(feature_dim=Settings.FEATURE_DIMENSION)
+def classify(
+    input_path: str,
+    k: int = Settings.K_NEIGHBORS,
+    model: str = Settings.FEATURE_MODEL,
+):
+    extractor, db = _open(model)
     search = SimilaritySearch(db)
     classifier = Classifier(search)
 
-    extractor = FeatureExtractor()
     image = load_image(input_path)
     if image is None:
         logger.error(f"Failed to load input image: {input_path}")
         return
-    feat = extractor.extract(image)
+    feat = extractor(image)
     if feat.size == 0:
         logger.error("Feature extraction returned empty features.")
         return
@@ -85,13 +144,24 @@ def classify(input_path: str, k: int = Settings.K_NEIGHBORS):
 
 def main():
     args = parse_args()
-    if args.mode == "preprocess":
-        preprocess(data_path=args.data_path)
+    if args.mode in ("preprocess", "sync"):
+        sync(data_path=args.data_path, model=args.model)
+    elif args.mode == "index":
+        index(
+            args.data_path,
+            args.shard_dir,
+            args.shard_id,
+            args.num_shards,
+            args.chunk_size,
+            args.model,
+        )
+    elif args.mode == "merge":
+        merge(args.shard_dir, args.num_shards, args.allow_partial, args.model)
     elif args.mode == "classify":
         if not args.input:
             logger.error("Input image path is required for classification.")
             return
-        classify(args.input, args.k)
+        classify(args.input, args.k, args.model)
 
 
 if __name__ == "__main__":
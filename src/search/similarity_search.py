@@ -1,37 +1,53 @@
 import numpy as np
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from src.database.feature_database import FeatureDatabase
+from src.database.snapshot import IndexSnapshot
 from src.utils.logger import logger
 from src.config.settings import Settings
 
 
 class SimilaritySearch:
+    """Nearest-neighbour lookups against the database's published snapshot.
+
+    Every method takes an optional ``snapshot``; callers that search and
+    then resolve labels should take ``self.snapshot`` once and pass it to
+    both, so a concurrent write cannot slip in between.
+    """
+
     def __init__(self, database: FeatureDatabase):
         self.database = database
         logger.info("Similarity search initialized.")
 
+    @property
+    def snapshot(self) -> IndexSnapshot:
+        return self.database.snapshot
+
     def find_similar(
-        self, query_features: np.ndarray, k: int = Settings.K_NEIGHBORS
+        self,
+        query_features: np.ndarray,
+        k: int = Settings.K_NEIGHBORS,
+        snapshot: Optional[IndexSnapshot] = None,
     ) -> Tuple[np.ndarray, np.ndarray]:
         if query_features.ndim != 2:
             logger.error("Query features should be a 2D array.")
             return np.array([]), np.array([])
-        distances, indices = self.database.search(query_features, k)
+        distances, indices = self.database.search(query_features, k, snapshot)
         if distances.size == 0 and indices.size == 0:
             logger.warning("No results found during similarity search.")
-        else:
-            logger.info(f"Found {k} similar features for each query.")
         return distances, indices
 
-    def get_labels(self, indices: np.ndarray) -> List[str]:
-        labels = []
-        logger.info(f"Retrieving labels for {indices.size} indices.")
-        logger.info(f"Database labels: {self.database.labels}")
-        logger.info(f"Indices: {indices.flatten()}")
-        for idx in indices.flatten():
-            if idx < len(self.database.labels):
-                labels.append(self.database.labels[idx])
-            else:
-                logger.warning(f"Index {idx} is out of bounds.")
-                labels.append("Unknown")
-        return labels
+    def get_labels(
+        self, indices: np.ndarray, snapshot: Optional[IndexSnapshot] = None
+    ) -> List[str]:
+        snapshot = snapshot or self.snapshot
+        return snapshot.names_for(indices).ravel().tolist()
+
+    def get_class_ids(
+        self, indices: np.ndarray, snapshot: Optional[IndexSnapshot] = None
+    ) -> np.ndarray:
+        snapshot = snapshot or self.snapshot
+        return snapshot.class_ids_for(indices)
+
+    @property
+    def class_names(self) -> List[str]:
+        return self.snapshot.class_names
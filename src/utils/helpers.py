@@ -1,8 +1,13 @@
+import hashlib
 import importlib
+import os
+from itertools import islice
+from typing import BinaryIO, Iterable, Iterator, List, TypeVar, Union
 from PIL import Image, UnidentifiedImageError
-import torch
 from src.utils.logger import logger
 
+T = TypeVar("T")
+
 
 def dynamic_import(module_name, class_name):
     module = importlib.import_module(module_name)
@@ -10,7 +15,18 @@ def dynamic_import(module_name, class_name):
     return cls
 
 
-def load_image(image_path):
+def model_path(path: str, model: str) -> str:
+    """``path`` moved into a directory of its own for ``model``.
+
+    Indexes, manifests and shards hold one model's vectors; keeping them
+    apart stops a model switch from mixing incompatible features.
+    """
+    directory, name = os.path.split(path)
+    return os.path.join(directory, model, name)
+
+
+def load_image(image_path: Union[str, BinaryIO]):
+    """Decode an image from a path or an open binary file object into RGB."""
     try:
         return Image.open(image_path).convert("RGB")
     except UnidentifiedImageError:
@@ -21,12 +37,54 @@ def load_image(image_path):
         return None
 
 
+def file_digest(file: BinaryIO, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a binary file object's contents; leaves it rewound."""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: file.read(chunk_size), b""):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def image_digest(image: Union[Image.Image, str]) -> str:
+    """SHA-256 of an image file's bytes, or of a decoded image's pixels."""
+    if isinstance(image, str):
+        with open(image, "rb") as f:
+            return file_digest(f)
+    digest = hashlib.sha256(f"{image.mode}{image.size}".encode("utf-8"))
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def chunked(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    """Yield lists of up to ``size`` consecutive items."""
+    if size <= 0:
+        raise ValueError(f"Chunk size must be greater than 0, got {size}")
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".gif")
+# Extension to store an image under by its PIL format; MPO is multi-frame JPEG
+FORMAT_EXTENSIONS = {
+    "PNG": ".png",
+    "JPEG": ".jpg",
+    "MPO": ".jpg",
+    "BMP": ".bmp",
+    "GIF": ".gif",
+}
+
+
 def is_image_file(filename):
-    return any(
-        filename.lower().endswith(ext)
-        for ext in [".png", ".jpg", ".jpeg", ".bmp", ".gif"]
-    )
+    return filename.lower().endswith(IMAGE_EXTENSIONS)
 
 
 def get_device():
+    # Imported here so that importing helpers does not load torch
+    import torch
+
     return torch.device("cuda" if torch.cuda.is_available() else "cpu")
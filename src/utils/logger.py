@@ -1,4 +1,6 @@
+import itertools
 import os
+from typing import Dict, Iterator
 from loguru import logger as loguru_logger
 from src.config.settings import Settings
 
@@ -25,3 +27,17 @@ def setup_logger():
 
 
 logger = setup_logger()
+
+_sample_counters: Dict[str, Iterator[int]] = {}
+
+
+def sampled(key: str, every: int = Settings.LOG_SAMPLE_EVERY) -> bool:
+    """True for the first and then every ``every``-th call with ``key``.
+
+    Guards per-request log lines on hot paths so they cost a counter bump
+    rather than a formatted message each time.
+    """
+    if every <= 1:
+        return True
+    counter = _sample_counters.setdefault(key, itertools.count())
+    return next(counter) % every == 0
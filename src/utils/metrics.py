@@ -0,0 +1,160 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+# Upper bounds in seconds, from sub-millisecond index lookups to slow uploads
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class Histogram:
+    """Cumulative histogram with labelled series, rendered in Prometheus text format.
+
+    Observing is a bisect and two additions under a lock, so it is cheap
+    enough for per-image and per-query hot paths.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label values: bucket counts (the last one is +Inf), sum, count
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float, *labels: str):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(
+                f"{self.name} takes labels {self.labelnames}, got {labels}"
+            )
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            series = [
+                (labels, list(c), s[0]) for labels, (c, s) in self._series.items()
+            ]
+        for labels, counts, total in sorted(series):
+            pairs = [f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, labels)]
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_pairs = pairs + [f'le="{le}"']
+                lines.append(f"{self.name}_bucket{_labels(bucket_pairs)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(pairs)} {total}")
+            lines.append(f"{self.name}_count{_labels(pairs)} {cumulative}")
+        return lines
+
+
+REGISTRY: List[Histogram] = []
+
+STAGE_SECONDS = Histogram(
+    "ttc_stage_seconds",
+    "Seconds spent in each stage of handling images and queries.",
+    ("stage",),
+)
+REQUEST_SECONDS = Histogram(
+    "ttc_request_seconds",
+    "Seconds from receiving a request to sending the end of its response.",
+    ("method", "route"),
+)
+
+
+def time_stage(stage: str):
+    """Context manager observing the enclosed block into ``ttc_stage_seconds``."""
+    return STAGE_SECONDS.time(stage)
+
+
+# One value, or values keyed by their ((label name, label value), ...) pairs
+GaugeValue = Union[float, Dict[Tuple[Tuple[str, str], ...], float]]
+
+
+def render(gauges: Optional[Dict[str, Tuple[str, GaugeValue]]] = None) -> str:
+    """All registered histograms plus ``gauges`` (name -> (help, value))."""
+    lines = []
+    for histogram in REGISTRY:
+        lines.extend(histogram.render())
+    for name, (documentation, value) in (gauges or {}).items():
+        lines.extend([f"# HELP {name} {documentation}", f"# TYPE {name} gauge"])
+        series = value if isinstance(value, dict) else {(): value}
+        for labels, sample in series.items():
+            pairs = [f'{n}="{_escape(v)}"' for n, v in labels]
+            lines.append(f"{name}{_labels(pairs)} {sample}")
+    return "\n".join(lines) + "\n"
+
+
+class RequestTimer:
+    """ASGI middleware recording each routed HTTP request in ``ttc_request_seconds``.
+
+    Requests are labelled by route template rather than raw path, so path
+    parameters do not create a series per value.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            # The router stores the matched route on the shared scope
+            route = scope.get("route")
+            if route is not None:
+                REQUEST_SECONDS.observe(
+                    time.perf_counter() - start, scope["method"], route.path
+                )
+
+
+def _labels(pairs: List[str]) -> str:
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,66 @@
+import io
+import os
+import tempfile
+
+# Settings are read from the environment at import, so configure it before src
+_ROOT = tempfile.mkdtemp(prefix="ttc-tests-")
+os.environ.update(
+    {
+        "DATA_PATH": os.path.join(_ROOT, "data"),
+        "DATABASE_PATH": os.path.join(_ROOT, "database", "features.faiss"),
+        "SHARD_PATH": os.path.join(_ROOT, "database", "shards"),
+        "WEIGHTS_PATH": os.path.join(_ROOT, "weights"),
+        "FEATURE_MODEL": "TinyExtractor",
+        "ALLOW_WEIGHTS_DOWNLOAD": "0",
+        "BACKGROUND_STARTUP": "0",
+        "LOGGING_LEVEL": "WARNING",
+    }
+)
+
+import pytest
+import torch
+from PIL import Image
+from torchvision import models
+
+import src.features
+from src.features.resnet_extractor import ResNetExtractor
+
+COLOURS = {"red": (200, 20, 20), "blue": (20, 20, 200)}
+
+
+class TinyExtractor(ResNetExtractor):
+    """An untrained ResNet-18 trunk, so tests need no weights file."""
+
+    def _load_model(self):
+        torch.manual_seed(0)
+        model = models.resnet18(weights=None)
+        feature_dim = model.fc.in_features
+        model = torch.nn.Sequential(*list(model.children())[:-1])
+        return model.to(self.device), feature_dim
+
+
+src.features.TinyExtractor = TinyExtractor
+
+
+def jpeg(colour, shade: int = 0) -> bytes:
+    buffer = io.BytesIO()
+    r, g, b = colour
+    Image.new("RGB", (96, 80), (r, g + shade, b)).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+@pytest.fixture(scope="module")
+def client():
+    """An API client over a data directory with a few red and blue images."""
+    from fastapi.testclient import TestClient
+    from src.app import app
+    from src.config.settings import Settings
+
+    for name, colour in COLOURS.items():
+        class_dir = os.path.join(Settings.DATA_PATH, name)
+        os.makedirs(class_dir, exist_ok=True)
+        for i in range(4):
+            with open(os.path.join(class_dir, f"{i}.jpg"), "wb") as f:
+                f.write(jpeg(colour, shade=5 * i))
+    with TestClient(app) as test_client:
+        yield test_client
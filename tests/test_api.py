@@ -0,0 +1,74 @@
+import io
+import json
+import os
+import zipfile
+import pytest
+from PIL import Image
+from conftest import COLOURS, jpeg
+from src.config.settings import Settings
+
+
+def test_classify_batch_streams_predictions(client):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as z:
+        z.writestr("more/blue.jpg", jpeg(COLOURS["blue"], shade=7))
+        z.writestr("more/notes.txt", "not an image")
+    files = [
+        ("files", ("red.jpg", jpeg(COLOURS["red"], shade=3), "image/jpeg")),
+        ("files", ("broken.jpg", b"not a jpeg", "image/jpeg")),
+        ("archive", ("more.zip", archive.getvalue(), "application/zip")),
+    ]
+
+    response = client.post("/classify_batch?top_n=1", files=files)
+
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["filename"] for line in lines] == [
+        "red.jpg",
+        "broken.jpg",
+        "more/blue.jpg",
+    ]
+    assert lines[0]["prediction"] == "red"
+    assert lines[1]["error"] == "Invalid image file."
+    assert lines[2]["prediction"] == "blue"
+
+
+def test_upload_names_files_by_image_format(client):
+    class_dir = os.path.join(Settings.DATA_PATH, "red")
+    before = set(os.listdir(class_dir))
+    png, tiff = io.BytesIO(), io.BytesIO()
+    Image.new("RGB", (64, 64), (210, 30, 30)).save(png, "PNG")
+    Image.new("RGB", (64, 64), (220, 30, 30)).save(tiff, "TIFF")
+
+    response = client.post(
+        "/upload_images?wait=true",
+        data={"class_name": "red"},
+        files=[("files", ("photo.webp", png.getvalue(), "image/webp"))],
+    )
+    assert response.status_code == 200
+    assert response.json()["added"] == 1
+    saved = set(os.listdir(class_dir)) - before
+    assert len(saved) == 1 and saved.pop().endswith(".png")
+
+    before = set(os.listdir(class_dir))
+    response = client.post(
+        "/upload_images",
+        data={"class_name": "red"},
+        files=[
+            ("files", ("red.jpg", jpeg(COLOURS["red"], shade=11), "image/jpeg")),
+            ("files", ("scan", tiff.getvalue(), "application/octet-stream")),
+        ],
+    )
+    assert response.status_code == 400
+    assert set(os.listdir(class_dir)) == before
+
+
+@pytest.mark.parametrize("path", ["/embed", "/classify_batch"])
+def test_too_many_images_is_413(client, monkeypatch, path):
+    monkeypatch.setattr(Settings, "MAX_BATCH_IMAGES", 1)
+    image = jpeg(COLOURS["red"])
+    files = [("files", (f"{i}.jpg", image, "image/jpeg")) for i in range(2)]
+
+    response = client.post(path, files=files)
+
+    assert response.status_code == 413
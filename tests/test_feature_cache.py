@@ -0,0 +1,52 @@
+import os
+import time
+
+import numpy as np
+
+from src.features.feature_cache import FeatureCache
+
+
+def cached_files(cache_dir) -> list:
+    return [name for _, _, names in os.walk(cache_dir) for name in names]
+
+
+def test_cached_arrays_are_copies(tmp_path):
+    cache = FeatureCache(max_entries=4, cache_dir=str(tmp_path))
+    features = np.ones(8, dtype=np.float32)
+    cache.put("a", features)
+    features[:] = 2
+    cache.get("a")[:] = 3
+    np.testing.assert_array_equal(cache.get("a"), np.ones(8))
+    # Entries read back from disk are copied too
+    reloaded = FeatureCache(max_entries=4, cache_dir=str(tmp_path))
+    reloaded.get("a")[:] = 4
+    np.testing.assert_array_equal(reloaded.get("a"), np.ones(8))
+
+
+def test_disk_cache_is_bounded(tmp_path):
+    features = np.zeros(64, dtype=np.float32)
+    cache = FeatureCache(max_entries=2, cache_dir=str(tmp_path))
+    cache.put("probe", features)
+    file_bytes = cache._disk_bytes
+
+    cache = FeatureCache(
+        max_entries=2, cache_dir=str(tmp_path), max_disk_bytes=3 * file_bytes
+    )
+    for i in range(10):
+        cache.put(str(i), features)
+    assert len(cached_files(tmp_path)) == 3
+    assert cache._read_disk("9", time.time()) is not None
+    assert cache._read_disk("0", time.time()) is None
+
+
+def test_expired_files_are_swept_at_start_up(tmp_path):
+    cache = FeatureCache(max_entries=2, cache_dir=str(tmp_path))
+    cache.put("old", np.zeros(8, dtype=np.float32))
+    cache.put("new", np.zeros(8, dtype=np.float32))
+    old = cache._disk_path("old")
+    os.utime(old, (time.time() - 120, time.time() - 120))
+
+    FeatureCache(max_entries=2, ttl=60, cache_dir=str(tmp_path))
+
+    assert not os.path.exists(old)
+    assert os.path.exists(cache._disk_path("new"))
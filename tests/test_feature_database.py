@@ -0,0 +1,47 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.database.feature_database import FeatureDatabase
+
+DIM = 64
+
+
+def features(n: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((n, DIM)).astype(np.float32)
+
+
+@pytest.mark.parametrize("encoding", ["sq8", "pq"])
+def test_compressed_encodings_use_less_memory_than_flat(tmp_path, encoding):
+    vectors = features(2000)
+    labels = ["class"] * len(vectors)
+    sizes = {}
+    for name in ("flat", encoding):
+        database = FeatureDatabase(
+            DIM, str(tmp_path / name / "features.faiss"), index_encoding=name
+        )
+        database.add_features(vectors, labels)
+        assert database.encoding == name
+        sizes[name] = database.memory_bytes()
+    assert sizes[encoding] < sizes["flat"]
+
+
+def test_raw_vectors_are_appended_to_disk(tmp_path):
+    path = str(tmp_path / "features.faiss")
+    vectors = features(300)
+    database = FeatureDatabase(DIM, path, index_encoding="sq8", rerank_factor=4)
+    database.add_features(vectors[:200], ["a"] * 200)
+    database.save_database()
+    database.add_features(vectors[200:], ["b"] * 100)
+    assert not database.raw_vectors.resident
+    assert os.path.getsize(database.vectors_path) == vectors.nbytes
+
+    # Only the saved rows survive a restart without the write-ahead log
+    reloaded = FeatureDatabase(DIM, path, index_encoding="sq8", rerank_factor=4)
+    assert len(reloaded.raw_vectors) == 200
+    np.testing.assert_array_equal(reloaded.raw_vectors.array, vectors[:200])
+    reloaded.add_features(vectors[200:], ["b"] * 100)
+    np.testing.assert_array_equal(reloaded.raw_vectors.array, vectors)
+    _, indices = reloaded.search(vectors[250:251], 1)
+    assert indices[0, 0] == 250
@@ -0,0 +1,36 @@
+import glob
+import os
+
+import numpy as np
+
+from src.data.data_loader import DataLoader
+from src.database.shard_indexer import ShardIndexer
+
+
+class FakeExtractor:
+    def iter_paths(self, paths, labels):
+        yield np.ones((len(paths), 4), dtype=np.float32), paths, labels
+
+
+def test_resume_does_not_overwrite_chunks_after_a_gap(tmp_path):
+    data_path = tmp_path / "data"
+    (data_path / "red").mkdir(parents=True)
+    for i in range(3):
+        (data_path / "red" / f"{i}.jpg").write_bytes(b"jpeg")
+    loader = DataLoader(str(data_path))
+    indexer = ShardIndexer(str(tmp_path / "shards"), chunk_size=1)
+    indexer.run(FakeExtractor(), loader)
+    first = indexer._chunk_files(0)[0]
+    os.remove(first)
+
+    assert indexer.run(FakeExtractor(), loader) == 1
+
+    chunks = sorted(glob.glob(str(tmp_path / "shards" / "*.npz")))
+    assert [os.path.basename(path)[-10:-4] for path in chunks] == [
+        "000001",
+        "000002",
+        "000003",
+    ]
+    indexed, _ = indexer._completed_paths()
+    assert len(indexed) == 3
+    assert indexer.read_progress(0)["chunks"] == 3
@@ -0,0 +1,32 @@
+import os
+
+import numpy as np
+
+from src.data.data_loader import DataLoader
+from src.data.manifest import Manifest, ManifestEntry
+from src.database.feature_database import FeatureDatabase
+from src.database.sync import sync_database
+
+
+def test_sync_leaves_unrecognised_files_alone(tmp_path):
+    data_path = tmp_path / "data"
+    (data_path / "red").mkdir(parents=True)
+    (data_path / "red" / "kept.webp").write_bytes(b"RIFF")
+    feature_db = FeatureDatabase(8, str(tmp_path / "features.faiss"))
+    ids = feature_db.add_features(np.ones((2, 8), dtype=np.float32), ["red", "red"])
+    manifest = Manifest(str(tmp_path / "manifest.db"))
+    manifest.upsert(
+        [
+            ManifestEntry("red/kept.webp", "red", 4, 0, "kept", int(ids[0])),
+            ManifestEntry("red/gone.webp", "red", 4, 0, "gone", int(ids[1])),
+        ]
+    )
+
+    # Nothing to extract, so no feature extractor is needed
+    result = sync_database(DataLoader(str(data_path)), None, feature_db, manifest)
+
+    assert result["removed"] == 1
+    assert list(manifest.entries()) == ["red/kept.webp"]
+    assert feature_db.ids.tolist() == [ids[0]]
+    manifest.close()
+    assert os.path.exists(data_path / "red" / "kept.webp")